@@ -1,14 +1,43 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList, ORDER_VAR
+from django.db.models import Case, IntegerField, Value, When
 from .models import Listing, ListingImage
 from .models import Message, MessageImage, Reply, ReplyImage
 
 
+class ListingChangeList(ChangeList):
+    """Order searched results by relevance unless a column sort is chosen."""
+
+    def get_ordering(self, request, queryset):
+        if self.query and ORDER_VAR not in self.params and 'search_rank' in queryset.query.annotations:
+            return ['search_rank', '-pk']
+        return super().get_ordering(request, queryset)
+
+
 @admin.register(Listing)
 class ListingAdmin(admin.ModelAdmin):
     list_display = ('artist', 'title', 'catalog_number', 'price', 'condition', 'featured', 'created_at', 'created_by')
-    search_fields = ('artist', 'title', 'catalog_number')
+    # Searching goes through accounts.search; these fields enable the search box
+    search_fields = ('artist', 'title', 'catalog_number', 'formats')
     list_filter = ('condition', 'created_at')
 
+    def get_changelist(self, request, **kwargs):
+        return ListingChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = (search_term or '').strip()
+        if not search_term:
+            return queryset, False
+        from .search import matching_ids, search_ids
+        ranked = search_ids(search_term)
+        rank = Case(
+            *[When(pk=pk, then=Value(pos)) for pos, pk in enumerate(ranked)],
+            default=Value(len(ranked)),
+            output_field=IntegerField(),
+        )
+        queryset = queryset.filter(pk__in=matching_ids(search_term)).annotate(search_rank=rank)
+        return queryset, False
+
 
 class ListingImageInline(admin.TabularInline):
     model = ListingImage
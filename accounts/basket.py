@@ -0,0 +1,165 @@
+"""Basket contents and the navbar basket summary.
+
+A basket is a mapping of listing id -> quantity: the user's BasketItem rows
+when signed in, the session's 'basket' dict otherwise. `load` reads the
+basket and all of its listings in one query and memoizes them on the
+request, so the badge, the basket page and checkout share one lookup.
+Guest baskets are cleaned of deleted and out-of-stock listings as they are
+loaded.
+
+`summary` (item count and total, for the badge) is kept in the session
+along with the versions it was computed under: the catalogue version of
+each listing in the basket (bumped on any stock, price or delete, see
+accounts.catalogue_cache) and, for signed-in users, a basket version bumped
+by the BasketItem signal handlers. While they all match, the badge costs a
+cache lookup and no queries; otherwise it is recomputed with `load`.
+"""
+from decimal import Decimal
+
+from django.core.cache import cache
+
+from .catalogue_cache import LISTING_VERSION_KEY, _ensure, _incr, listing_versions
+
+SESSION_KEY = 'basket'
+SUMMARY_SESSION_KEY = 'basket_summary'
+USER_VERSION_KEY = 'basket:user:{}:version'
+
+
+def _user_id(request):
+    user = getattr(request, 'user', None)
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+def bump_user(user_id):
+    """Invalidate the basket summaries of `user_id` (their BasketItems changed)."""
+    try:
+        _incr(USER_VERSION_KEY.format(user_id))
+    except Exception:
+        # Cache failures shouldn't block basket changes
+        pass
+
+
+def load(request):
+    """Return ``(quantities, listings)`` for the request's basket.
+
+    `quantities` maps str(listing id) -> quantity and `listings` maps the int
+    id to its Listing. For guests `quantities` is the session dict itself,
+    cleaned in place. Memoized on the request; call `forget` after changing
+    the basket within the same request.
+    """
+    cached = getattr(request, '_basket', None)
+    if cached is not None:
+        return cached
+    user_id = _user_id(request)
+    if user_id is not None:
+        try:
+            from .models import BasketItem
+            items = BasketItem.objects.filter(basket__user_id=user_id).select_related('listing')
+            quantities = {str(bi.listing_id): bi.quantity for bi in items}
+            listings = {bi.listing_id: bi.listing for bi in items}
+        except Exception:
+            quantities, listings = {}, {}
+    else:
+        quantities = request.session.setdefault(SESSION_KEY, {})
+        listings = {}
+        if quantities:
+            from .models import Listing
+            listings = Listing.objects.in_bulk([int(lid) for lid in quantities if str(lid).isdigit()])
+            changed = False
+            for lid in list(quantities):
+                listing = listings.get(int(lid)) if str(lid).isdigit() else None
+                # Drop stale ids and listings that have gone out of stock
+                if listing is None or (listing.stock is not None and listing.stock == 0):
+                    del quantities[lid]
+                    if listing is not None:
+                        del listings[listing.pk]
+                    changed = True
+            if changed:
+                request.session.modified = True
+    request._basket = (quantities, listings)
+    return request._basket
+
+
+def forget(request):
+    """Drop the request's memoized basket and badge count so they are read again."""
+    request.__dict__.pop('_basket', None)
+    # The lazy value from accounts.context_processors.basket_count
+    request.__dict__.pop('_lazy_basket_count', None)
+
+
+def lines(request):
+    """Return ``(items, total)`` for the basket page, one dict per listing."""
+    quantities, listings = load(request)
+    items = []
+    total = 0
+    for lid, qty in quantities.items():
+        listing = listings.get(int(lid))
+        if listing is None:
+            continue
+        qty = int(qty)
+        line_total = (listing.price or 0) * qty
+        items.append({'listing': listing, 'quantity': qty, 'line_total': line_total})
+        total += line_total
+    return items, total
+
+
+def _versions(user_id, listing_ids):
+    """Return the basket version of `user_id` and each listing's version, from one cache lookup.
+
+    Missing keys come back as None, which never matches a stored summary.
+    """
+    keys = [LISTING_VERSION_KEY.format(pk) for pk in listing_ids]
+    if user_id is not None:
+        keys.append(USER_VERSION_KEY.format(user_id))
+    try:
+        found = cache.get_many(keys)
+    except Exception:
+        found = {}
+    user_version = found.get(USER_VERSION_KEY.format(user_id)) if user_id is not None else None
+    return user_version, [[pk, found.get(LISTING_VERSION_KEY.format(pk))] for pk in listing_ids]
+
+
+def _guest_items(quantities):
+    return sorted([int(lid), int(qty)] for lid, qty in quantities.items() if str(lid).isdigit())
+
+
+def summary(request):
+    """Return ``{'count', 'total'}`` for the basket badge.
+
+    Served from the session while the basket and its listings are
+    unchanged; recomputed (one query) otherwise.
+    """
+    user_id = _user_id(request)
+    session = request.session
+    if user_id is None and not session.get(SESSION_KEY):
+        return {'count': 0, 'total': Decimal(0)}
+
+    stored = session.get(SUMMARY_SESSION_KEY)
+    if stored and stored.get('user') == user_id and getattr(request, '_basket', None) is None:
+        # Guests change their basket in the session itself, so compare it
+        # directly; signed-in baskets are covered by the user's basket version
+        if user_id is not None or _guest_items(session.get(SESSION_KEY, {})) == stored.get('items'):
+            user_version, versions = _versions(user_id, [pk for pk, _ in stored['versions']])
+            if user_version == stored['user_version'] and versions == stored['versions']:
+                return {'count': stored['count'], 'total': Decimal(stored['total'])}
+
+    quantities, listings = load(request)
+    items, total = lines(request)
+    count = sum(item['quantity'] for item in items)
+    ids = sorted(listings)
+    try:
+        # Seeds missing versions, so the stored summary can be trusted next time
+        _, listing_version_map = listing_versions(ids)
+        user_version = _ensure(USER_VERSION_KEY.format(user_id)) if user_id is not None else None
+        session[SUMMARY_SESSION_KEY] = {
+            'user': user_id,
+            'user_version': user_version,
+            'items': None if user_id is not None else _guest_items(quantities),
+            'versions': [[pk, listing_version_map[pk]] for pk in ids],
+            'count': count,
+            'total': str(total),
+        }
+    except Exception:
+        # Without the cache there's nothing to validate a stored summary against
+        session.pop(SUMMARY_SESSION_KEY, None)
+    return {'count': count, 'total': Decimal(total)}
@@ -0,0 +1,137 @@
+"""Catalogue versions for exact store fragment-cache invalidation.
+
+Every listing has a version number, bumped whenever the listing or its
+images change (see the handlers in accounts.signals); its store card
+fragments are keyed on it alone, so editing one listing re-renders only
+that listing's cards. The catalogue as a whole has a version too, keyed
+into the featured strip, and bumped only when the strip can change: a
+featured listing changes or a listing is featured or unfeatured. A change
+simply makes the old fragments unreachable; no TTL has to guess how long
+markup stays valid. Any change also moves the catalogue modification time
+used for conditional GETs of the store.
+
+Version keys are seeded from the clock rather than starting at 1, so a key
+evicted from the cache can never come back with a value an old fragment was
+stored under.
+"""
+import time
+
+from django.core.cache import cache
+
+from integrations import metrics
+
+CATALOGUE_VERSION_KEY = 'catalogue:version'
+CATALOGUE_MODIFIED_KEY = 'catalogue:modified'
+LISTING_VERSION_KEY = 'catalogue:listing:{}:version'
+
+
+def _seed():
+    return int(time.time() * 1000)
+
+
+def _ensure(key):
+    """Return the current value of version `key`, seeding it when missing."""
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, _seed(), None)
+        value = cache.get(key)
+    return value
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Missing key: seed it (ahead of anything it could have held before)
+        if not cache.add(key, _seed(), None):
+            return cache.incr(key)
+        return cache.get(key)
+
+
+def catalogue_version():
+    return _ensure(CATALOGUE_VERSION_KEY)
+
+
+def _touch():
+    try:
+        cache.set(CATALOGUE_MODIFIED_KEY, time.time(), None)
+    except Exception:
+        pass
+
+
+def bump_catalogue():
+    """Invalidate the catalogue-wide fragments (the featured strip)."""
+    try:
+        _incr(CATALOGUE_VERSION_KEY)
+    except Exception:
+        # Cache failures shouldn't block saves
+        pass
+    _touch()
+
+
+def bump_listing(listing_id, catalogue=False):
+    """Invalidate the card fragments of one listing.
+
+    Pass `catalogue` when the change can show in the featured strip too
+    (the listing is, or was, featured).
+    """
+    try:
+        _incr(LISTING_VERSION_KEY.format(listing_id))
+    except Exception:
+        pass
+    if catalogue:
+        bump_catalogue()
+    else:
+        _touch()
+
+
+def catalogue_state():
+    """Return ``(catalogue_version, modified_at)`` in a single cache lookup.
+
+    `modified_at` is the epoch time of the newest Listing/ListingImage
+    change; when unknown (e.g. after a cache flush) it is reset to now so
+    clients revalidate rather than keep a stale copy.
+    """
+    try:
+        found = cache.get_many([CATALOGUE_VERSION_KEY, CATALOGUE_MODIFIED_KEY])
+    except Exception:
+        found = {}
+    version = found.get(CATALOGUE_VERSION_KEY)
+    modified = found.get(CATALOGUE_MODIFIED_KEY)
+    if version is None:
+        version = catalogue_version()
+    if modified is None:
+        modified = time.time()
+        cache.add(CATALOGUE_MODIFIED_KEY, modified, None)
+    return version, modified
+
+
+def listing_versions(listing_ids):
+    """Return ``(catalogue_version, {listing_id: version})`` in one lookup."""
+    keys = {LISTING_VERSION_KEY.format(pk): pk for pk in listing_ids}
+    try:
+        found = cache.get_many(list(keys) + [CATALOGUE_VERSION_KEY])
+    except Exception:
+        found = {}
+    versions = {}
+    for key, pk in keys.items():
+        value = found.get(key)
+        versions[pk] = value if value is not None else _ensure(key)
+    catalogue = found.get(CATALOGUE_VERSION_KEY)
+    if catalogue is None:
+        catalogue = catalogue_version()
+    return catalogue, versions
+
+
+def record_fragment(name, hit):
+    """Count a fragment cache hit or miss for `name` (see integrations.metrics)."""
+    metrics.incr(f'fragments.{name}.{"hits" if hit else "misses"}')
+
+
+def fragment_stats(names):
+    """Return ``{name: {'hits': n, 'misses': n}}`` aggregated across workers.
+
+    Includes this process's not-yet-flushed tallies.
+    """
+    values = metrics.counters(f'fragments.{n}.{f}' for n in names for f in ('hits', 'misses'))
+    return {n: {f: values[f'fragments.{n}.{f}'] for f in ('hits', 'misses')} for n in names}
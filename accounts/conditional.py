@@ -0,0 +1,94 @@
+"""ETag / Last-Modified helpers for django.views.decorators.http.condition.
+
+The validators come from a single cache lookup (the catalogue version for
+the store, the cached payload's fetch time for the Discogs endpoints), so an
+unchanged resource is answered with 304 before any template is rendered or
+any query runs. Each helper returns None when a response must not be served
+conditionally; `condition` then falls through to a normal 200.
+"""
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+
+from django.contrib import messages
+
+# Bump when the markup or JSON shape of a conditional view changes, so
+# clients holding the old representation don't get a 304 for it.
+REPRESENTATION_VERSION = '1'
+
+
+def _etag(*parts):
+    raw = '|'.join(str(p) for p in (REPRESENTATION_VERSION,) + parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _as_datetime(epoch):
+    return datetime.fromtimestamp(epoch, tz=dt_timezone.utc)
+
+
+def _store_state(request):
+    """Return the memoized ``(version, modified_at)`` or None if not cacheable.
+
+    Only anonymous visitors with no pending flash messages are served
+    conditionally: for them the store page is identical apart from the CSRF
+    token, which stays valid for as long as their CSRF cookie does, and the
+    basket badge, which is covered by the ETag.
+    """
+    if not hasattr(request, '_store_conditional_state'):
+        state = None
+        if not request.user.is_authenticated and not len(messages.get_messages(request)):
+            from .catalogue_cache import catalogue_state
+            state = catalogue_state()
+        request._store_conditional_state = state
+    return request._store_conditional_state
+
+
+def store_etag(request, *args, **kwargs):
+    state = _store_state(request)
+    if state is None:
+        return None
+    version, modified = state
+    is_ajax = request.headers.get('x-requested-with') == 'XMLHttpRequest'
+    # The navbar shows the guest's basket count; stock changes that alter it
+    # already bump the catalogue version
+    basket = sorted((str(k), str(v)) for k, v in (request.session.get('basket') or {}).items())
+    return _etag('store', version, modified, request.get_full_path(), is_ajax, basket)
+
+
+def store_last_modified(request, *args, **kwargs):
+    state = _store_state(request)
+    if state is None or request.session.get('basket'):
+        # Basket changes don't move the modification time; leave it to the ETag
+        return None
+    return _as_datetime(state[1])
+
+
+def _discogs_fetched_at(request, key):
+    memo = getattr(request, '_discogs_fetched_at', None)
+    if memo is None:
+        memo = request._discogs_fetched_at = {}
+    if key not in memo:
+        from integrations.discogs import cached_fetched_at
+        memo[key] = cached_fetched_at(key)
+    return memo[key]
+
+
+def discogs_conditional(key_func):
+    """Return ``(etag_func, last_modified_func)`` for a Discogs JSON view.
+
+    `key_func(release_id)` gives the cache key of the payload the view is
+    built from. Nothing is returned (so no 304) until that payload is cached.
+    """
+    def etag_func(request, release_id, *args, **kwargs):
+        key = key_func(release_id)
+        fetched_at = _discogs_fetched_at(request, key)
+        if fetched_at is None:
+            return None
+        return _etag(key, fetched_at)
+
+    def last_modified_func(request, release_id, *args, **kwargs):
+        fetched_at = _discogs_fetched_at(request, key_func(release_id))
+        if not fetched_at:
+            return None
+        return _as_datetime(fetched_at)
+
+    return etag_func, last_modified_func
@@ -0,0 +1,123 @@
+"""Incrementally maintained facet counts for the store filters.
+
+Each in-stock listing contributes one count to every facet value it has:
+its format names, condition, decade of release and country. Counts live in
+the FacetCount table and are adjusted by the Listing signal handlers in
+accounts.signals whenever a listing is created, edited, restocked, sold out
+or deleted, so the store reads them with one small query instead of a
+GROUP BY over the catalogue. `manage.py recount_facets` recomputes them
+from scratch and should be scheduled periodically to correct any drift
+(e.g. from queryset.update() calls that bypass signals).
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+FACET_FORMAT = 'format'
+FACET_CONDITION = 'condition'
+FACET_DECADE = 'decade'
+FACET_COUNTRY = 'country'
+
+# Display order and headings for the store
+FACETS = [
+    (FACET_FORMAT, 'Format'),
+    (FACET_CONDITION, 'Condition'),
+    (FACET_DECADE, 'Decade'),
+    (FACET_COUNTRY, 'Country'),
+]
+
+
+def format_names(formats):
+    """Return the distinct format names in a Listing.formats string.
+
+    Listings store formats as ``"Vinyl — LP, Album; CD — Album"`` (see
+    create_listing) or as a plain search-hit string such as ``"Vinyl, LP"``;
+    the name is the first part of each ``;``-separated entry.
+    """
+    names = []
+    for entry in (formats or '').split(';'):
+        name = entry.split('—')[0].split(',')[0].strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def listing_facets(listing):
+    """Return the set of ``(facet, value)`` pairs `listing` counts towards.
+
+    Out-of-stock listings are hidden from the store and count towards none.
+    """
+    if listing is None or listing.stock == 0:
+        return set()
+    values = {(FACET_FORMAT, name) for name in format_names(listing.formats)}
+    if listing.condition:
+        values.add((FACET_CONDITION, listing.condition))
+    if listing.year:
+        values.add((FACET_DECADE, str(listing.year // 10 * 10)))
+    country = (listing.country or '').strip()
+    if country:
+        values.add((FACET_COUNTRY, country))
+    return values
+
+
+def _bump(facet, value, delta):
+    from .models import FacetCount
+
+    updated = FacetCount.objects.filter(facet=facet, value=value).update(count=F('count') + delta)
+    if updated or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            FacetCount.objects.create(facet=facet, value=value, count=delta)
+    except IntegrityError:
+        # Another worker created the row first; apply our delta to it
+        FacetCount.objects.filter(facet=facet, value=value).update(count=F('count') + delta)
+
+
+def apply_change(before, after):
+    """Adjust counts for a listing moving from `before` to `after`.
+
+    Either side may be None (create / delete). Only facet values that
+    actually changed are touched.
+    """
+    old, new = listing_facets(before), listing_facets(after)
+    with transaction.atomic():
+        for facet, value in old - new:
+            _bump(facet, value, -1)
+        for facet, value in new - old:
+            _bump(facet, value, 1)
+
+
+def recount():
+    """Recompute every facet count from the listings table. Returns rows written."""
+    from .models import FacetCount, Listing
+
+    totals = {}
+    fields = ('formats', 'condition', 'year', 'country', 'stock')
+    for listing in Listing.objects.exclude(stock=0).only(*fields).iterator(chunk_size=2000):
+        for key in listing_facets(listing):
+            totals[key] = totals.get(key, 0) + 1
+    with transaction.atomic():
+        FacetCount.objects.all().delete()
+        FacetCount.objects.bulk_create(
+            FacetCount(facet=facet, value=value, count=count) for (facet, value), count in totals.items()
+        )
+    return len(totals)
+
+
+def facet_counts():
+    """Return ``{facet: [(value, label, count), ...]}`` for facets with matches."""
+    from .models import FacetCount, Listing
+
+    condition_labels = dict(Listing.CONDITION_CHOICES)
+    grouped = {facet: [] for facet, _ in FACETS}
+    for row in FacetCount.objects.filter(count__gt=0).order_by('facet', '-count', 'value'):
+        if row.facet not in grouped:
+            continue
+        if row.facet == FACET_CONDITION:
+            label = condition_labels.get(row.value, row.value)
+        elif row.facet == FACET_DECADE:
+            label = f'{row.value}s'
+        else:
+            label = row.value
+        grouped[row.facet].append((row.value, label, row.count))
+    return grouped
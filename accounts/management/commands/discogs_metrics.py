@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Show Discogs client metrics aggregated across workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero all counters after printing them')
+
+    def handle(self, *args, **options):
+        from integrations.discogs import metrics_snapshot, reset_metrics
+        snapshot = metrics_snapshot()
+        for name, m in snapshot['endpoints'].items():
+            ratio = f"{m['hit_ratio'] * 100:.1f}%" if m['hit_ratio'] is not None else '-'
+            latency = m['latency']
+            avg = f"{latency['avg_ms']:.0f}" if latency['avg_ms'] is not None else '-'
+            self.stdout.write(
+                f"{name}: {m['hit']} hit(s), {m['stale']} stale, {m['miss']} miss(es), "
+                f"{m['fallback']} fallback(s), {ratio} hit ratio; {latency['count']} upstream call(s), "
+                f"{m['status_4xx']} 4xx, {m['status_5xx']} 5xx, {m['upstream_error']} error(s); "
+                f"latency avg {avg} ms, p50 <= {latency['p50_ms'] or '-'} ms, p95 <= {latency['p95_ms'] or '-'} ms"
+            )
+        for name, value in snapshot['totals'].items():
+            self.stdout.write(f'{name}: {value}')
+        remaining = snapshot['ratelimit_remaining']
+        if remaining is not None:
+            self.stdout.write(f"ratelimit remaining: {remaining} ({snapshot['ratelimit_remaining_age']}s ago)")
+        else:
+            self.stdout.write('ratelimit remaining: not reported yet')
+        circuit = snapshot['circuit']
+        self.stdout.write(f"circuit: {circuit['state']} ({circuit['failures']} consecutive failure(s))")
+        for name, room in snapshot['tokens']:
+            self.stdout.write(f'token {name}: {room} call(s) left this minute')
+        if options['reset']:
+            reset_metrics()
+            self.stdout.write(self.style.SUCCESS('Metrics reset'))
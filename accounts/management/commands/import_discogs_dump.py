@@ -0,0 +1,170 @@
+import gzip
+import json
+import os
+import time
+import xml.etree.ElementTree as ET
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+DEFAULT_FORMATS = 'Vinyl,CD,Cassette'
+UPDATE_FIELDS = ['payload', 'etag', 'fetched_at', 'source', 'artist', 'title', 'year', 'country', 'formats', 'catno']
+
+
+def _open(path):
+    """Open a dump for binary reading, transparently gunzipping it."""
+    with open(path, 'rb') as fh:
+        magic = fh.read(2)
+    if magic == b'\x1f\x8b':
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def _text(elem, tag):
+    child = elem.find(tag)
+    return (child.text or '').strip() if child is not None else ''
+
+
+def release_payload(elem):
+    """Build an API-shaped release dict from a dump ``<release>`` element.
+
+    Only the fields the app reads (see create_listing and
+    discogs_release_details_view) are kept.
+    """
+    released = _text(elem, 'released')
+    year = int(released[:4]) if released[:4].isdigit() else None
+    return {
+        'id': int(elem.get('id')),
+        'title': _text(elem, 'title'),
+        'artists': [{'name': _text(a, 'name'), 'join': _text(a, 'join')} for a in elem.iterfind('artists/artist')],
+        'labels': [{'name': l.get('name', ''), 'catno': l.get('catno', '')} for l in elem.iterfind('labels/label')],
+        'formats': [
+            {
+                'name': f.get('name', ''),
+                'qty': f.get('qty', ''),
+                'text': f.get('text', ''),
+                'descriptions': [d.text for d in f.iterfind('descriptions/description') if d.text],
+            }
+            for f in elem.iterfind('formats/format')
+        ],
+        'genres': [g.text for g in elem.iterfind('genres/genre') if g.text],
+        'styles': [s.text for s in elem.iterfind('styles/style') if s.text],
+        'country': _text(elem, 'country'),
+        'released': released,
+        'year': year,
+        'notes': _text(elem, 'notes'),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream a Discogs monthly releases dump (optionally gzipped) into the local '
+        'DiscogsRelease table and its search index'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='discogs_YYYYMMDD_releases.xml[.gz]')
+        parser.add_argument(
+            '--formats', default=os.environ.get('DISCOGS_IMPORT_FORMATS', DEFAULT_FORMATS),
+            help='Comma-separated format names to keep (default: %(default)s)',
+        )
+        parser.add_argument(
+            '--countries', default=os.environ.get('DISCOGS_IMPORT_COUNTRIES', ''),
+            help='Comma-separated countries to keep (default: all)',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--checkpoint', help='Progress file used to resume an interrupted import (default: <path>.checkpoint)',
+        )
+        parser.add_argument('--restart', action='store_true', help='Ignore any checkpoint and start from the beginning')
+
+    def handle(self, *args, **options):
+        from accounts.models import DiscogsRelease
+        from accounts.search import index_releases
+
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'No such file: {path}')
+        formats = {f.strip().lower() for f in options['formats'].split(',') if f.strip()}
+        countries = {c.strip().lower() for c in options['countries'].split(',') if c.strip()}
+        batch_size = options['batch_size']
+        checkpoint_path = options['checkpoint'] or f'{path}.checkpoint'
+
+        # Dumps list releases in ascending id order, so the last committed id
+        # is enough to resume: everything up to it is skipped without writes.
+        state = {'last_id': 0, 'imported': 0}
+        if not options['restart'] and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as fh:
+                state.update(json.load(fh))
+            self.stdout.write(f"Resuming after release {state['last_id']} ({state['imported']} imported so far)")
+
+        started = time.monotonic()
+        scanned = imported = 0
+        batch = []
+
+        def flush():
+            nonlocal imported
+            if not batch:
+                return
+            ids = [r.release_id for r in batch]
+            # Never overwrite richer payloads fetched from the API
+            from_api = set(
+                DiscogsRelease.objects.filter(pk__in=ids, source=DiscogsRelease.SOURCE_API)
+                .values_list('pk', flat=True)
+            )
+            rows = [r for r in batch if r.release_id not in from_api]
+            with transaction.atomic():
+                DiscogsRelease.objects.bulk_create(
+                    rows, update_conflicts=True, unique_fields=['release_id'], update_fields=UPDATE_FIELDS,
+                )
+                index_releases(rows)
+            imported += len(rows)
+            state['last_id'] = ids[-1]
+            state['imported'] += len(rows)
+            with open(checkpoint_path, 'w') as fh:
+                json.dump(state, fh)
+            batch.clear()
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.stdout.write(
+                f"release {state['last_id']}: {scanned} scanned, {imported} imported "
+                f'({scanned / elapsed:.0f} scanned/s, {imported / elapsed:.0f} rows/s)'
+            )
+
+        now = timezone.now()
+        root = None
+        with _open(path) as fh:
+            for event, elem in ET.iterparse(fh, events=('start', 'end')):
+                if root is None:
+                    root = elem
+                    continue
+                if event != 'end' or elem.tag != 'release':
+                    continue
+                scanned += 1
+                try:
+                    release_id = int(elem.get('id'))
+                except (TypeError, ValueError):
+                    release_id = 0
+                keep = release_id > state['last_id'] and elem.get('status', 'Accepted') == 'Accepted'
+                if keep and countries:
+                    keep = _text(elem, 'country').lower() in countries
+                if keep and formats:
+                    keep = any(f.get('name', '').lower() in formats for f in elem.iterfind('formats/format'))
+                if keep:
+                    data = release_payload(elem)
+                    batch.append(DiscogsRelease.from_payload(
+                        release_id, data, source=DiscogsRelease.SOURCE_DUMP, fetched_at=now,
+                    ))
+                # Drop the parsed release so memory stays flat however big the dump is
+                root.clear()
+                if len(batch) >= batch_size:
+                    flush()
+        flush()
+        # Finished: the next (newer) dump starts from the beginning
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} release(s) of {scanned} scanned in {elapsed:.1f}s ({imported / elapsed:.0f} rows/s)'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the listing and Discogs release full-text search indexes'
+
+    def handle(self, *args, **options):
+        from accounts.search import get_backend
+        backend = get_backend()
+        total = backend.rebuild()
+        releases = backend.rebuild_releases()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {backend.__class__.__name__} index ({total} listing(s), {releases} release(s))'
+        ))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized StoreCard table from all listings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Listings processed per batch')
+
+    def handle(self, *args, **options):
+        from django.db import transaction
+        from accounts.models import Listing, StoreCard
+
+        batch_size = max(1, options['batch_size'])
+        total = 0
+        with transaction.atomic():
+            StoreCard.objects.all().delete()
+            batch = []
+            for listing in Listing.objects.prefetch_related('images').iterator(chunk_size=batch_size):
+                batch.append(StoreCard.build(listing, images=listing.images.all()))
+                if len(batch) >= batch_size:
+                    StoreCard.objects.bulk_create(batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                StoreCard.objects.bulk_create(batch)
+                total += len(batch)
+        # Cached fragments are keyed on catalogue versions, not on the cards
+        # themselves, so they would keep serving the old markup
+        from accounts.catalogue_cache import bump_catalogue, bump_listing
+        try:
+            for pk in Listing.objects.values_list('pk', flat=True).iterator():
+                bump_listing(pk)
+            bump_catalogue()
+        except Exception as exc:
+            self.stderr.write(f'Could not invalidate cached store fragments: {exc}')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total} store card(s)'))
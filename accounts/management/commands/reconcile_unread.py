@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-user unread message counters (schedule periodically)'
+
+    def handle(self, *args, **options):
+        from accounts.unread import reconcile
+        corrected = reconcile()
+        self.stdout.write(self.style.SUCCESS(f'Reconciled unread counters, corrected {corrected} counter(s)'))
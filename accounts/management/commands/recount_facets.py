@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Recompute store facet counts from all listings (schedule periodically)'
+
+    def handle(self, *args, **options):
+        from accounts.facets import recount
+        total = recount()
+        self.stdout.write(self.style.SUCCESS(f'Recounted {total} facet value(s)'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counters for the store fragment cache'
+
+    def handle(self, *args, **options):
+        from accounts.catalogue_cache import catalogue_version, fragment_stats
+        stats = fragment_stats(['store_featured', 'store_card'])
+        self.stdout.write(f'Catalogue version: {catalogue_version()}')
+        for name, counts in stats.items():
+            total = counts['hits'] + counts['misses']
+            ratio = (counts['hits'] / total * 100) if total else 0.0
+            self.stdout.write(f"{name}: {counts['hits']} hit(s), {counts['misses']} miss(es), {ratio:.1f}% hit ratio")
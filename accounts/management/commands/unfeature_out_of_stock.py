@@ -5,8 +5,15 @@ class Command(BaseCommand):
     help = 'Unfeature any listings that have stock == 0'
 
     def handle(self, *args, **options):
-        from accounts.models import Listing
+        from accounts.models import Listing, StoreCard
         qs = Listing.objects.filter(stock=0, featured=True)
-        total = qs.count()
+        ids = list(qs.values_list('pk', flat=True))
+        total = len(ids)
         qs.update(featured=False)
+        # queryset.update() bypasses signals, so sync the store cards directly
+        StoreCard.objects.filter(pk__in=ids).update(featured=False)
+        if ids:
+            from accounts.catalogue_cache import bump_listing
+            for pk in ids:
+                bump_listing(pk, catalogue=True)
         self.stdout.write(self.style.SUCCESS(f'Unfeatured {total} listing(s) with stock==0'))
@@ -0,0 +1,192 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+
+# Release id the last Discogs warm-up stopped after (see warm_discogs)
+DISCOGS_CURSOR_KEY = 'warm:discogs:cursor'
+
+
+def _host():
+    """A host the store will answer for, so requests pass ALLOWED_HOSTS."""
+    for host in settings.ALLOWED_HOSTS:
+        host = host.lstrip('.')
+        if host and host != '*':
+            return host
+    return 'localhost'
+
+
+class Command(BaseCommand):
+    help = (
+        'Prefill the store, facet/search indexes and Discogs data for listings '
+        'after a deploy, within a time budget'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget', type=float, default=120.0, help='Seconds to spend in total (default: %(default)s)')
+        parser.add_argument('--store-pages', type=int, default=3, help='Store pages to render (default: %(default)s)')
+        parser.add_argument('--concurrency', type=int, default=4, help='Parallel Discogs lookups (default: %(default)s)')
+        parser.add_argument(
+            '--discogs-share', type=float, default=0.5,
+            help="Fraction of this minute's remaining Discogs quota to use, leaving the rest "
+                 'to live traffic (default: %(default)s)',
+        )
+        parser.add_argument('--skip-discogs', action='store_true')
+
+    def handle(self, *args, **options):
+        self.deadline = time.monotonic() + options['budget']
+        stages = [
+            ('store', lambda: self.warm_store(options['store_pages'])),
+            ('indexes', self.warm_indexes),
+        ]
+        if not options['skip_discogs']:
+            stages.append(('discogs', lambda: self.warm_discogs(options['concurrency'], options['discogs_share'])))
+
+        started = time.monotonic()
+        for name, stage in stages:
+            if self.remaining() <= 0:
+                self.stdout.write(self.style.WARNING(f'{name}: skipped, time budget spent'))
+                continue
+            stage_started = time.monotonic()
+            try:
+                summary = stage()
+            except Exception as exc:
+                # Warming is best effort; never fail the release phase over it
+                summary = f'failed ({exc.__class__.__name__}: {exc})'
+            self.stdout.write(f'{name}: {summary} in {time.monotonic() - stage_started:.2f}s')
+        self.stdout.write(self.style.SUCCESS(f'Caches warmed in {time.monotonic() - started:.2f}s'))
+
+    def remaining(self):
+        return self.deadline - time.monotonic()
+
+    def warm_store(self, pages):
+        """Render the first store pages (featured strip included) as an anonymous visitor."""
+        import json
+        from importlib import import_module
+
+        from django.contrib.auth.models import AnonymousUser
+        from django.test import RequestFactory
+        from accounts.views import store_list
+
+        factory = RequestFactory(HTTP_HOST=_host())
+        session_store = import_module(settings.SESSION_ENGINE).SessionStore
+
+        def get(**kwargs):
+            # The view itself, without middleware: nothing to redirect or log in
+            request = factory.get('/store/', secure=True, **kwargs)
+            request.user = AnonymousUser()
+            request.session = session_store()
+            return store_list(request)
+
+        # The full first page caches the featured strip along with its cards
+        response = get()
+        if response.status_code != 200:
+            return f'stopped at page 1 (HTTP {response.status_code})'
+        rendered = 1
+        # Later pages are fetched like the "load more" button does; each
+        # answer carries the cursor of the batch after it. The first one
+        # repeats page 1 (cache hits by now) to learn where page 2 starts.
+        cursor = ''
+        while rendered < pages and self.remaining() > 0:
+            response = get(data={'cursor': cursor} if cursor else {}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+            if response.status_code != 200:
+                return f'stopped at page {rendered + 1} (HTTP {response.status_code})'
+            if cursor:
+                rendered += 1
+            cursor = json.loads(response.content)['next_cursor']
+            if not cursor:
+                break
+        return f'{rendered} page(s) rendered'
+
+    def warm_indexes(self):
+        """Read the facet and search tables once so their pages are in the database cache."""
+        from accounts.facets import facet_counts, recount
+        from accounts.models import DiscogsRelease, FacetCount, Listing
+        from accounts.search import get_backend
+
+        notes = []
+        if not FacetCount.objects.exists() and Listing.objects.exists():
+            notes.append(f'{recount()} facet value(s) recounted')
+        counts = facet_counts()
+        notes.append(f'{sum(len(v) for v in counts.values())} facet value(s)')
+        backend = get_backend()
+        listing = next(iter(Listing.objects.values_list('artist', flat=True)[:1]), '')
+        word = (listing.split() or ['a'])[0]
+        releases = DiscogsRelease.objects.filter(pk__in=backend.release_matching_ids(word)).count()
+        notes.append(
+            f'{len(backend.search_ids(word))} listing and {releases} release match(es) '
+            f'for "{word}" via {backend.__class__.__name__}'
+        )
+        return ', '.join(notes)
+
+    def warm_discogs(self, concurrency, share):
+        """Fetch release details and price suggestions for listings with a release id.
+
+        One run only spends part of the current quota, so runs take turns:
+        each starts after the release the previous one stopped at (kept in
+        the cache under DISCOGS_CURSOR_KEY) and wraps around, until every
+        listing's release has been warmed.
+        """
+        from django.core.cache import cache
+        from accounts.models import Listing
+        from integrations import discogs
+
+        ids = list(
+            Listing.objects.filter(release_id__isnull=False)
+            .order_by('release_id').values_list('release_id', flat=True).distinct()
+        )
+        if not ids:
+            return 'no listings with a release id'
+        cached = discogs.enrich_releases(ids, cached_only=True)
+        todo = [
+            rid for rid in ids
+            if not (
+                cached.get(rid)
+                and (cached[rid]['release'] or cached[rid]['not_found'])
+                and cached[rid]['price_suggestions'] is not None
+            )
+        ]
+        if discogs.circuit.state()['state'] != 'closed':
+            return f'{len(ids) - len(todo)} of {len(ids)} release(s) already cached; Discogs unavailable, rest skipped'
+        try:
+            after = int(cache.get(DISCOGS_CURSOR_KEY) or 0)
+        except Exception:
+            after = 0
+        todo = [rid for rid in todo if rid > after] + [rid for rid in todo if rid <= after]
+        # Each release costs up to two calls; leave live traffic its share
+        allowance = int(sum(discogs.token_pool.headroom().values()) * share) // 2
+        batch = todo[:allowance]
+
+        def warm(rid):
+            try:
+                discogs.get_release(rid)
+                discogs.price_suggestions(rid)
+            finally:
+                connection.close()
+
+        executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='warm-discogs')
+        futures = [executor.submit(warm, rid) for rid in batch]
+        done, not_done = wait(futures, timeout=max(self.remaining(), 0))
+        # Lookups already running finish within DISCOGS_CALL_BUDGET; queued ones are dropped
+        executor.shutdown(wait=True, cancel_futures=True)
+        failed = sum(1 for f in done if f.exception() is not None)
+        # The next run picks up after the last release of the unbroken run
+        # of finished lookups (failed ones are retried on the next lap)
+        finished = None
+        for rid, future in zip(batch, futures):
+            if future not in done:
+                break
+            finished = rid
+        if finished is not None:
+            try:
+                cache.set(DISCOGS_CURSOR_KEY, finished, None)
+            except Exception:
+                pass
+        return (
+            f'{len(done) - failed} fetched, {len(ids) - len(todo)} already cached, '
+            f'{len(todo) - len(done) + failed} left for later (quota allowance {allowance}, '
+            f'{len(not_done)} cut by the time budget) of {len(ids)} release(s)'
+        )
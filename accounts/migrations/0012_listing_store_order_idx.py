@@ -0,0 +1,17 @@
+# Generated by Django 4.2.24 on 2026-10-17 14:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_order_orderitem'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['-featured', '-created_at', 'id'], name='listing_store_order_idx'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.24 on 2026-10-17 14:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_store_cards(apps, schema_editor):
+    """Project every existing listing into a StoreCard (see StoreCard.build)."""
+    Listing = apps.get_model('accounts', 'Listing')
+    ListingImage = apps.get_model('accounts', 'ListingImage')
+    StoreCard = apps.get_model('accounts', 'StoreCard')
+    condition_labels = dict(Listing._meta.get_field('condition').choices)
+    images = models.Prefetch('images', queryset=ListingImage.objects.order_by('order', '-created_at'))
+    cards = []
+    for listing in Listing.objects.prefetch_related(images).iterator(chunk_size=500):
+        image_urls = []
+        for img in listing.images.all():
+            try:
+                url = img.image.url if img.image else ''
+            except Exception:
+                url = ''
+            if url:
+                image_urls.append({'url': url, 'caption': img.caption or ''})
+        cards.append(StoreCard(
+            listing=listing,
+            artist=listing.artist,
+            title=listing.title,
+            formats=listing.formats,
+            release_notes=listing.release_notes,
+            price=listing.price,
+            thumb=listing.thumb,
+            stock=listing.stock,
+            in_stock=listing.stock != 0,
+            condition_label=condition_labels.get(listing.condition, '') if listing.condition else '',
+            image_urls=image_urls,
+            featured=listing.featured,
+            created_at=listing.created_at,
+        ))
+    StoreCard.objects.bulk_create(cards, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_listing_store_order_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoreCard',
+            fields=[
+                ('listing', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='store_card', serialize=False, to='accounts.listing')),
+                ('artist', models.CharField(blank=True, max_length=255)),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('formats', models.TextField(blank=True)),
+                ('release_notes', models.TextField(blank=True)),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('thumb', models.URLField(blank=True)),
+                ('stock', models.IntegerField(blank=True, null=True)),
+                ('in_stock', models.BooleanField(default=True)),
+                ('condition_label', models.CharField(blank=True, max_length=32)),
+                ('image_urls', models.JSONField(blank=True, default=list)),
+                ('featured', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-featured', '-created_at', 'listing_id'],
+                'indexes': [models.Index(fields=['in_stock', '-featured', '-created_at', 'listing'], name='storecard_store_order_idx')],
+            },
+        ),
+        migrations.RunPython(fill_store_cards, migrations.RunPython.noop),
+    ]
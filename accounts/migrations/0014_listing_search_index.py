@@ -0,0 +1,57 @@
+from django.db import migrations
+
+FTS_TABLE = 'accounts_listing_fts'
+
+PG_DOCUMENT = (
+    "to_tsvector('simple', coalesce(artist, '') || ' ' || coalesce(title, '') || ' ' "
+    "|| coalesce(formats, '') || ' ' || coalesce(catalog_number, ''))"
+)
+
+
+def create_search_index(apps, schema_editor):
+    """Create the vendor-specific full-text index (see accounts.search)."""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+                'artist, title, formats, catalog_number, tokenize="unicode61 remove_diacritics 2")'
+            )
+        except Exception:
+            # SQLite built without FTS5: accounts.search falls back to icontains
+            return
+        schema_editor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, artist, title, formats, catalog_number) '
+            'SELECT id, artist, title, formats, catalog_number FROM accounts_listing'
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS listing_search_doc_idx ON accounts_listing USING GIN ({PG_DOCUMENT})'
+        )
+        for column in ('artist', 'title', 'formats'):
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS listing_{column}_trgm_idx ON accounts_listing '
+                f'USING GIN ({column} gin_trgm_ops)'
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS listing_search_doc_idx')
+        for column in ('artist', 'title', 'formats'):
+            schema_editor.execute(f'DROP INDEX IF EXISTS listing_{column}_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_storecard'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.24 on 2026-10-17 14:47
+
+from django.db import migrations, models
+
+
+def fill_facets(apps, schema_editor):
+    """Copy the new StoreCard columns from their listings and count the facets (see accounts.facets.recount)."""
+    from accounts.facets import listing_facets
+
+    Listing = apps.get_model('accounts', 'Listing')
+    StoreCard = apps.get_model('accounts', 'StoreCard')
+    FacetCount = apps.get_model('accounts', 'FacetCount')
+    fields = ('formats', 'condition', 'year', 'country', 'stock')
+    cards = []
+    totals = {}
+    for listing in Listing.objects.only(*fields).iterator(chunk_size=2000):
+        cards.append(StoreCard(
+            listing_id=listing.pk, condition=listing.condition or '', year=listing.year, country=listing.country or '',
+        ))
+        for key in listing_facets(listing):
+            totals[key] = totals.get(key, 0) + 1
+    StoreCard.objects.bulk_update(cards, ['condition', 'year', 'country'], batch_size=500)
+    FacetCount.objects.bulk_create(
+        FacetCount(facet=facet, value=value, count=count) for (facet, value), count in totals.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_listing_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storecard',
+            name='condition',
+            field=models.CharField(blank=True, max_length=4),
+        ),
+        migrations.AddField(
+            model_name='storecard',
+            name='country',
+            field=models.CharField(blank=True, max_length=128),
+        ),
+        migrations.AddField(
+            model_name='storecard',
+            name='year',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=16)),
+                ('value', models.CharField(max_length=128)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('facet', 'value')},
+            },
+        ),
+        migrations.RunPython(fill_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.24 on 2026-10-17 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_facetcount_storecard_facets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiscogsRelease',
+            fields=[
+                ('release_id', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('payload', models.BinaryField()),
+                ('etag', models.CharField(blank=True, max_length=255)),
+                ('fetched_at', models.DateTimeField()),
+            ],
+        ),
+    ]
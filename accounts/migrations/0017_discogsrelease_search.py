@@ -0,0 +1,113 @@
+# Generated by Django 4.2.24 on 2026-10-17 14:57
+
+import json
+import zlib
+
+from django.db import migrations, models
+
+FTS_TABLE = 'accounts_discogsrelease_fts'
+
+PG_DOCUMENT = (
+    "to_tsvector('simple', coalesce(artist, '') || ' ' || coalesce(title, '') || ' ' "
+    "|| coalesce(catno, ''))"
+)
+
+
+def fill_search_columns(apps, schema_editor):
+    """Denormalize the search columns of releases cached before this migration."""
+    DiscogsRelease = apps.get_model('accounts', 'DiscogsRelease')
+    for release in DiscogsRelease.objects.iterator():
+        try:
+            data = json.loads(zlib.decompress(bytes(release.payload)).decode('utf-8'))
+        except Exception:
+            continue
+        release.artist = ', '.join(a.get('name') for a in data.get('artists') or [] if a.get('name'))[:255]
+        release.title = (data.get('title') or '')[:255]
+        release.year = data.get('year') or None
+        release.country = (data.get('country') or '')[:128]
+        formats = []
+        for f in data.get('formats') or []:
+            for part in [f.get('name')] + list(f.get('descriptions') or []):
+                if part and part not in formats:
+                    formats.append(part)
+        release.formats = ', '.join(formats)[:255]
+        release.catno = '; '.join(lbl.get('catno') for lbl in data.get('labels') or [] if lbl.get('catno'))[:255]
+        release.save()
+
+
+def create_search_index(apps, schema_editor):
+    """Create the vendor-specific release search index (see accounts.search)."""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+                'artist, title, catno, tokenize="unicode61 remove_diacritics 2")'
+            )
+        except Exception:
+            # SQLite built without FTS5: accounts.search falls back to icontains
+            return
+        schema_editor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, artist, title, catno) '
+            'SELECT release_id, artist, title, catno FROM accounts_discogsrelease'
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS discogsrelease_search_doc_idx ON accounts_discogsrelease '
+            f'USING GIN ({PG_DOCUMENT})'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS discogsrelease_search_doc_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_discogsrelease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='discogsrelease',
+            name='artist',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='discogsrelease',
+            name='catno',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='discogsrelease',
+            name='country',
+            field=models.CharField(blank=True, max_length=128),
+        ),
+        migrations.AddField(
+            model_name='discogsrelease',
+            name='formats',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='discogsrelease',
+            name='source',
+            field=models.CharField(choices=[('api', 'API'), ('dump', 'Data dump')], default='api', max_length=8),
+        ),
+        migrations.AddField(
+            model_name='discogsrelease',
+            name='title',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='discogsrelease',
+            name='year',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_search_columns, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
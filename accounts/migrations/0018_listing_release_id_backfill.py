@@ -0,0 +1,31 @@
+import re
+
+from django.db import migrations
+
+RELEASE_ID_RE = re.compile(r'(?:^|/releases?/)(\d+)(?:-[^/]*)?/?$')
+
+
+def fill_release_id(apps, schema_editor):
+    """Copy the Discogs release id create_listing stored in `resource_url`.
+
+    Older listings hold either the bare id or a Discogs release URL.
+    """
+    Listing = apps.get_model('accounts', 'Listing')
+    listings = []
+    for listing in Listing.objects.filter(release_id__isnull=True).exclude(resource_url='').only('pk', 'resource_url'):
+        match = RELEASE_ID_RE.search(listing.resource_url.strip())
+        if match:
+            listing.release_id = int(match.group(1))
+            listings.append(listing)
+    Listing.objects.bulk_update(listings, ['release_id'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0017_discogsrelease_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_release_id, migrations.RunPython.noop),
+    ]
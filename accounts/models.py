@@ -1,7 +1,9 @@
 from django.db import models
 from django.conf import settings
 from django.core.validators import FileExtensionValidator
+import json
 import uuid
+import zlib
 from django.utils import timezone
 
 try:
@@ -46,6 +48,10 @@ class Listing(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Matches the store's keyset ordering (see accounts.pagination)
+            models.Index(fields=['-featured', '-created_at', 'id'], name='listing_store_order_idx'),
+        ]
 
     def __str__(self):
         return f"{self.artist} - {self.title} ({self.catalog_number})"
@@ -62,13 +68,16 @@ class Listing(models.Model):
         except Exception:
             # best-effort: don't block saves on unexpected errors
             pass
-        # Capture previous stock to detect transitions to 0
-        prev_stock = None
+        # Capture the previous row to detect transitions (stock to 0, facet
+        # changes). Signal handlers read it from `_previous`.
+        previous = None
         if self.pk:
             try:
-                prev_stock = Listing.objects.get(pk=self.pk).stock
+                previous = Listing.objects.get(pk=self.pk)
             except Exception:
-                prev_stock = None
+                previous = None
+        self._previous = previous
+        prev_stock = previous.stock if previous is not None else None
 
         super().save(*args, **kwargs)
 
@@ -100,6 +109,173 @@ class ListingImage(models.Model):
         return f"Image for {self.listing} ({self.pk})"
 
 
+class StoreCard(models.Model):
+    """Denormalized read model for a store card.
+
+    One row per Listing holding everything the public store renders, so a
+    store page is a single query with no per-card image lookups. Rows are
+    kept current by signal handlers in accounts.signals; rebuild the whole
+    table with `manage.py rebuild_store_cards`.
+    """
+    listing = models.OneToOneField(Listing, primary_key=True, related_name='store_card', on_delete=models.CASCADE)
+    artist = models.CharField(max_length=255, blank=True)
+    title = models.CharField(max_length=255, blank=True)
+    formats = models.TextField(blank=True)
+    release_notes = models.TextField(blank=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    thumb = models.URLField(blank=True)
+    stock = models.IntegerField(null=True, blank=True)
+    # False when stock == 0; the store only shows in-stock cards
+    in_stock = models.BooleanField(default=True)
+    condition = models.CharField(max_length=4, blank=True)
+    condition_label = models.CharField(max_length=32, blank=True)
+    year = models.PositiveIntegerField(null=True, blank=True)
+    country = models.CharField(max_length=128, blank=True)
+    # Ordered list of {"url": ..., "caption": ...} for the listing's images
+    image_urls = models.JSONField(default=list, blank=True)
+    featured = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-featured', '-created_at', 'listing_id']
+        indexes = [
+            models.Index(fields=['in_stock', '-featured', '-created_at', 'listing'], name='storecard_store_order_idx'),
+        ]
+
+    def __str__(self):
+        return f"Store card for listing {self.pk}"
+
+    @classmethod
+    def build(cls, listing, images=None):
+        """Return an unsaved StoreCard projected from `listing`.
+
+        `images` may be passed to avoid a query when the caller has already
+        fetched (or prefetched) the listing's images.
+        """
+        if images is None:
+            images = listing.images.all()
+        image_urls = []
+        for img in images:
+            try:
+                url = img.image.url if img.image else ''
+            except Exception:
+                url = ''
+            if url:
+                image_urls.append({'url': url, 'caption': img.caption or ''})
+        return cls(
+            listing=listing,
+            artist=listing.artist,
+            title=listing.title,
+            formats=listing.formats,
+            release_notes=listing.release_notes,
+            price=listing.price,
+            thumb=listing.thumb,
+            stock=listing.stock,
+            in_stock=listing.stock != 0,
+            condition=listing.condition,
+            condition_label=listing.get_condition_display() if listing.condition else '',
+            year=listing.year,
+            country=listing.country,
+            image_urls=image_urls,
+            featured=listing.featured,
+            created_at=listing.created_at,
+        )
+
+    @classmethod
+    def refresh(cls, listing_id):
+        """Recompute the card for `listing_id` (or drop it if the listing is gone)."""
+        listing = Listing.objects.filter(pk=listing_id).first()
+        if listing is None:
+            cls.objects.filter(pk=listing_id).delete()
+            return None
+        card = cls.build(listing)
+        card.save()
+        return card
+
+
+class FacetCount(models.Model):
+    """Number of in-stock listings per store facet value (see accounts.facets)."""
+    facet = models.CharField(max_length=16)
+    value = models.CharField(max_length=128)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = (('facet', 'value'),)
+
+    def __str__(self):
+        return f"{self.facet}={self.value}: {self.count}"
+
+
+class DiscogsRelease(models.Model):
+    """Persistent copy of a Discogs release payload.
+
+    The second tier behind the Django cache in integrations.discogs.get_release:
+    it survives restarts and is shared by every worker, and its ETag lets the
+    client revalidate with a conditional request instead of a full fetch.
+    The JSON payload is stored zlib-compressed; the search columns are
+    denormalized from it for the local release search (accounts.search).
+
+    Rows come either from the API or from the monthly data dumps loaded by
+    `manage.py import_discogs_dump`.
+    """
+    SOURCE_API = 'api'
+    SOURCE_DUMP = 'dump'
+    SOURCE_CHOICES = [
+        (SOURCE_API, 'API'),
+        (SOURCE_DUMP, 'Data dump'),
+    ]
+
+    release_id = models.PositiveIntegerField(primary_key=True)
+    payload = models.BinaryField()
+    etag = models.CharField(max_length=255, blank=True)
+    fetched_at = models.DateTimeField()
+    source = models.CharField(max_length=8, choices=SOURCE_CHOICES, default=SOURCE_API)
+    artist = models.CharField(max_length=255, blank=True)
+    title = models.CharField(max_length=255, blank=True)
+    year = models.PositiveIntegerField(null=True, blank=True)
+    country = models.CharField(max_length=128, blank=True)
+    # Search-hit style, e.g. "Vinyl, LP, Album"
+    formats = models.CharField(max_length=255, blank=True)
+    catno = models.CharField(max_length=255, blank=True)
+
+    def __str__(self):
+        return f"Discogs release {self.release_id}"
+
+    @staticmethod
+    def pack(data):
+        return zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+
+    @property
+    def data(self):
+        return json.loads(zlib.decompress(bytes(self.payload)).decode('utf-8'))
+
+    @classmethod
+    def from_payload(cls, release_id, data, **fields):
+        """Return an unsaved row for an API-shaped release payload."""
+        artist = ', '.join(a.get('name') for a in data.get('artists') or [] if a.get('name'))
+        formats = []
+        for f in data.get('formats') or []:
+            for part in [f.get('name')] + list(f.get('descriptions') or []):
+                if part and part not in formats:
+                    formats.append(part)
+        catnos = [lbl.get('catno') for lbl in data.get('labels') or [] if lbl.get('catno')]
+        try:
+            year = int(data.get('year') or 0) or None
+        except (TypeError, ValueError):
+            year = None
+        return cls(
+            release_id=release_id,
+            payload=cls.pack(data),
+            artist=artist[:255],
+            title=(data.get('title') or '')[:255],
+            year=year,
+            country=(data.get('country') or '')[:128],
+            formats=', '.join(formats)[:255],
+            catno='; '.join(catnos)[:255],
+            **fields,
+        )
+
+
 # Messaging models
 MAX_MESSAGE_IMAGES = 5
 ALLOWED_IMAGE_EXTENSIONS = ['jpg', 'jpeg', 'png']
@@ -220,6 +396,17 @@ class ReplyRead(models.Model):
         self.save(update_fields=['read_at'])
 
 
+class UnreadCounter(models.Model):
+    """Unread messages and replies per user, for the navbar badge (see accounts.unread)."""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, primary_key=True, related_name='unread_counter', on_delete=models.CASCADE,
+    )
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.count} unread"
+
+
 class Basket(models.Model):
     """Persistent basket per authenticated user."""
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='basket')
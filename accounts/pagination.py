@@ -0,0 +1,77 @@
+"""Keyset (cursor) pagination for the public store listing.
+
+The store is ordered by ``(-featured, -created_at, pk)``. Rather than using
+OFFSET (which makes deep pages scan and discard every earlier row) each page
+hands out an opaque cursor holding the sort key of its last row; the next
+page seeks straight past that row with a WHERE clause on the same columns.
+"""
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+# Number of cards rendered per store page / "load more" request.
+STORE_PAGE_SIZE = 24
+
+# The ordering the cursor is keyed on. Keep in sync with keyset_filter().
+STORE_ORDERING = ('-featured', '-created_at', 'pk')
+
+
+def encode_cursor(obj):
+    """Return an opaque, URL-safe cursor for the sort key of `obj`."""
+    payload = {
+        'f': bool(obj.featured),
+        'c': obj.created_at.isoformat() if obj.created_at else None,
+        'i': obj.pk,
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a cursor produced by encode_cursor().
+
+    Returns a ``(featured, created_at, pk)`` tuple, or None when the token is
+    missing or malformed (callers then start from the first page).
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        created_at = parse_datetime(payload['c']) if payload.get('c') else None
+        if created_at is None:
+            return None
+        return bool(payload['f']), created_at, int(payload['i'])
+    except Exception:
+        return None
+
+
+def keyset_filter(cursor):
+    """Return a Q selecting rows that sort strictly after `cursor`."""
+    featured, created_at, pk = cursor
+    after = (
+        Q(featured=featured, created_at__lt=created_at)
+        | Q(featured=featured, created_at=created_at, pk__gt=pk)
+    )
+    if featured:
+        # Non-featured rows always sort after featured ones
+        after |= Q(featured=False)
+    return after
+
+
+def keyset_page(qs, cursor_token=None, page_size=STORE_PAGE_SIZE):
+    """Return ``(items, next_cursor)`` for one page of `qs`.
+
+    `qs` is re-ordered by STORE_ORDERING. One extra row is fetched to detect
+    whether another page exists; `next_cursor` is None on the last page.
+    """
+    qs = qs.order_by(*STORE_ORDERING)
+    cursor = decode_cursor(cursor_token)
+    if cursor is not None:
+        qs = qs.filter(keyset_filter(cursor))
+    rows = list(qs[:page_size + 1])
+    items = rows[:page_size]
+    next_cursor = encode_cursor(items[-1]) if len(rows) > page_size else None
+    return items, next_cursor
@@ -0,0 +1,292 @@
+"""Pluggable full-text search over store listings.
+
+Three backends share one API:
+
+- ``PostgresSearchBackend`` (when DATABASE_URL points at Postgres) matches a
+  ``to_tsvector`` expression covered by a GIN index and uses pg_trgm GIN
+  indexes for the per-field store filters.
+- ``SqliteFTSSearchBackend`` (the default SQLite database) queries an FTS5
+  shadow table, ``accounts_listing_fts``, whose rowid is the listing id.
+- ``BasicSearchBackend`` falls back to ``icontains`` when neither index is
+  available.
+
+The indexes are created by migration 0014. The FTS5 table is kept in sync
+by the Listing signal handlers in accounts.signals; the Postgres indexes are
+expression indexes maintained by the database itself. Set
+``LISTING_SEARCH_BACKEND`` to a dotted class path to override the choice.
+
+Each backend also searches the local copy of Discogs releases
+(DiscogsRelease, filled from the API and by `manage.py import_discogs_dump`)
+through a second index created by migration 0017.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+FTS_TABLE = 'accounts_listing_fts'
+RELEASE_FTS_TABLE = 'accounts_discogsrelease_fts'
+
+# Per-field filters accepted by matching_ids(), mapped to Listing columns
+FIELD_COLUMNS = {
+    'artist': 'artist',
+    'title': 'title',
+    'formats': 'formats',
+}
+
+# Maximum number of ids returned by search_ids() when no limit is given
+DEFAULT_RANK_LIMIT = 500
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _tokens(text):
+    return _TOKEN_RE.findall((text or '').lower())
+
+
+class BasicSearchBackend:
+    """``icontains`` matching with newest-first ordering; no index needed."""
+
+    def matching_ids(self, query=None, **fields):
+        from .models import Listing
+
+        qs = Listing.objects.all()
+        if query:
+            cond = Q()
+            for column in ('artist', 'title', 'formats', 'catalog_number'):
+                cond |= Q(**{f'{column}__icontains': query})
+            qs = qs.filter(cond)
+        for name, value in fields.items():
+            if value:
+                qs = qs.filter(**{f'{FIELD_COLUMNS[name]}__icontains': value})
+        return qs.values('pk')
+
+    def search_ids(self, query, limit=DEFAULT_RANK_LIMIT):
+        from .models import Listing
+
+        return list(
+            Listing.objects.filter(pk__in=self.matching_ids(query))
+            .order_by('-created_at').values_list('pk', flat=True)[:limit]
+        )
+
+    def index_listing(self, listing):
+        pass
+
+    def remove_listing(self, listing_id):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def release_matching_ids(self, query):
+        from .models import DiscogsRelease
+
+        qs = DiscogsRelease.objects.all()
+        if query:
+            cond = Q()
+            for column in ('artist', 'title', 'catno'):
+                cond |= Q(**{f'{column}__icontains': query})
+            qs = qs.filter(cond)
+        return qs.values('pk')
+
+    def index_releases(self, releases):
+        pass
+
+    def rebuild_releases(self):
+        return 0
+
+
+class SqliteFTSSearchBackend(BasicSearchBackend):
+    """FTS5 shadow table with bm25 ranking and token-prefix matching."""
+
+    # bm25 column weights: artist, title, formats, catalog_number
+    WEIGHTS = (10.0, 8.0, 2.0, 4.0)
+
+    def _match_expr(self, query=None, **fields):
+        terms = [f'"{tok}"*' for tok in _tokens(query)]
+        for name, value in fields.items():
+            terms.extend(f'{FIELD_COLUMNS[name]} : "{tok}"*' for tok in _tokens(value))
+        return ' AND '.join(terms)
+
+    def matching_ids(self, query=None, **fields):
+        expr = self._match_expr(query, **fields)
+        if not expr:
+            # Nothing indexable (e.g. punctuation only); match like before
+            return super().matching_ids(query, **fields)
+        return RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [expr])
+
+    def search_ids(self, query, limit=DEFAULT_RANK_LIMIT):
+        expr = self._match_expr(query)
+        if not expr:
+            return super().search_ids(query, limit=limit)
+        weights = ', '.join(str(w) for w in self.WEIGHTS)
+        with connection.cursor() as cur:
+            cur.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s',
+                [expr, limit],
+            )
+            return [row[0] for row in cur.fetchall()]
+
+    def index_listing(self, listing):
+        with connection.cursor() as cur:
+            cur.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [listing.pk])
+            cur.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, artist, title, formats, catalog_number) VALUES (%s, %s, %s, %s, %s)',
+                [listing.pk, listing.artist, listing.title, listing.formats, listing.catalog_number],
+            )
+
+    def remove_listing(self, listing_id):
+        with connection.cursor() as cur:
+            cur.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [listing_id])
+
+    def rebuild(self):
+        with connection.cursor() as cur:
+            cur.execute(f'DELETE FROM {FTS_TABLE}')
+            cur.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, artist, title, formats, catalog_number) '
+                'SELECT id, artist, title, formats, catalog_number FROM accounts_listing'
+            )
+            cur.execute(f'SELECT count(*) FROM {FTS_TABLE}')
+            return cur.fetchone()[0]
+
+    def release_matching_ids(self, query):
+        expr = self._match_expr(query)
+        if not expr:
+            return super().release_matching_ids(query)
+        return RawSQL(f'SELECT rowid FROM {RELEASE_FTS_TABLE} WHERE {RELEASE_FTS_TABLE} MATCH %s', [expr])
+
+    def index_releases(self, releases):
+        rows = [(r.pk, r.artist, r.title, r.catno) for r in releases]
+        with connection.cursor() as cur:
+            cur.executemany(f'DELETE FROM {RELEASE_FTS_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+            cur.executemany(
+                f'INSERT INTO {RELEASE_FTS_TABLE} (rowid, artist, title, catno) VALUES (%s, %s, %s, %s)', rows
+            )
+
+    def rebuild_releases(self):
+        with connection.cursor() as cur:
+            cur.execute(f'DELETE FROM {RELEASE_FTS_TABLE}')
+            cur.execute(
+                f'INSERT INTO {RELEASE_FTS_TABLE} (rowid, artist, title, catno) '
+                'SELECT release_id, artist, title, catno FROM accounts_discogsrelease'
+            )
+            cur.execute(f'SELECT count(*) FROM {RELEASE_FTS_TABLE}')
+            return cur.fetchone()[0]
+
+
+class PostgresSearchBackend(BasicSearchBackend):
+    """tsvector + pg_trgm search backed by the GIN indexes from migration 0014."""
+
+    # Must match the indexed expression exactly for the planner to use it
+    DOCUMENT = (
+        "to_tsvector('simple', coalesce(artist, '') || ' ' || coalesce(title, '') || ' ' "
+        "|| coalesce(formats, '') || ' ' || coalesce(catalog_number, ''))"
+    )
+    # Indexed by migration 0017
+    RELEASE_DOCUMENT = (
+        "to_tsvector('simple', coalesce(artist, '') || ' ' || coalesce(title, '') || ' ' "
+        "|| coalesce(catno, ''))"
+    )
+
+    def _tsquery(self, query):
+        return ' & '.join(f'{tok}:*' for tok in _tokens(query))
+
+    def _where(self, query=None, **fields):
+        clauses, params = [], []
+        tsq = self._tsquery(query)
+        if tsq:
+            clauses.append(f"{self.DOCUMENT} @@ to_tsquery('simple', %s)")
+            params.append(tsq)
+        for name, value in fields.items():
+            if value:
+                # ILIKE '%x%' is served by the gin_trgm_ops index on the column
+                clauses.append(f'{FIELD_COLUMNS[name]} ILIKE %s')
+                params.append('%' + connection.ops.prep_for_like_query(value) + '%')
+        return clauses, params
+
+    def matching_ids(self, query=None, **fields):
+        clauses, params = self._where(query, **fields)
+        if not clauses:
+            return super().matching_ids(query, **fields)
+        return RawSQL('SELECT id FROM accounts_listing WHERE ' + ' AND '.join(clauses), params)
+
+    def search_ids(self, query, limit=DEFAULT_RANK_LIMIT):
+        tsq = self._tsquery(query)
+        if not tsq:
+            return super().search_ids(query, limit=limit)
+        with connection.cursor() as cur:
+            cur.execute(
+                f"SELECT id FROM accounts_listing WHERE {self.DOCUMENT} @@ to_tsquery('simple', %s) "
+                f"ORDER BY ts_rank({self.DOCUMENT}, to_tsquery('simple', %s)) "
+                "+ similarity(coalesce(artist, '') || ' ' || coalesce(title, ''), %s) DESC, created_at DESC "
+                "LIMIT %s",
+                [tsq, tsq, query, limit],
+            )
+            return [row[0] for row in cur.fetchall()]
+
+    def release_matching_ids(self, query):
+        tsq = self._tsquery(query)
+        if not tsq:
+            return super().release_matching_ids(query)
+        return RawSQL(
+            f"SELECT release_id FROM accounts_discogsrelease WHERE {self.RELEASE_DOCUMENT} @@ to_tsquery('simple', %s)",
+            [tsq],
+        )
+
+
+def _fts_table_exists():
+    try:
+        return FTS_TABLE in connection.introspection.table_names()
+    except Exception:
+        return False
+
+
+_backend = None
+
+
+def get_backend():
+    """Return the configured search backend (resolved once per process)."""
+    global _backend
+    if _backend is not None:
+        return _backend
+    path = getattr(settings, 'LISTING_SEARCH_BACKEND', None)
+    if path:
+        _backend = import_string(path)()
+    elif connection.vendor == 'postgresql':
+        _backend = PostgresSearchBackend()
+    elif connection.vendor == 'sqlite' and _fts_table_exists():
+        _backend = SqliteFTSSearchBackend()
+    else:
+        _backend = BasicSearchBackend()
+    return _backend
+
+
+def matching_ids(query=None, artist=None, title=None, formats=None):
+    """Return a subquery of matching listing ids, for use as ``pk__in=``."""
+    return get_backend().matching_ids(query, artist=artist, title=title, formats=formats)
+
+
+def search_ids(query, limit=DEFAULT_RANK_LIMIT):
+    """Return up to `limit` listing ids matching `query`, best match first."""
+    return get_backend().search_ids(query, limit=limit)
+
+
+def index_listing(listing):
+    get_backend().index_listing(listing)
+
+
+def remove_listing(listing_id):
+    get_backend().remove_listing(listing_id)
+
+
+def release_matching_ids(query):
+    """Return a subquery of DiscogsRelease ids matching `query`, for ``pk__in=``."""
+    return get_backend().release_matching_ids(query)
+
+
+def index_releases(releases):
+    get_backend().index_releases(releases)
@@ -1,6 +1,6 @@
 from django.contrib.auth.signals import user_logged_in
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_delete
 
 
 @receiver(post_save, dispatch_uid='listing_unfeature_on_zero_stock')
@@ -16,7 +16,197 @@ def unfeature_on_zero_stock(sender, instance, created, **kwargs):
             return
         if getattr(instance, 'stock', None) == 0 and getattr(instance, 'featured', False):
             # Use queryset update to avoid triggering save() again
-            sender.objects.filter(pk=instance.pk, featured=True).update(featured=False)
+            if sender.objects.filter(pk=instance.pk, featured=True).update(featured=False):
+                from .catalogue_cache import bump_listing
+                bump_listing(instance.pk, catalogue=True)
+    except Exception:
+        pass
+
+
+@receiver(post_save, dispatch_uid='listing_update_search_index')
+def update_search_index_on_listing_save(sender, instance, **kwargs):
+    """Keep the full-text search index in sync with Listing.save()."""
+    try:
+        if sender.__name__ != 'Listing':
+            return
+        from .search import index_listing
+        index_listing(instance)
+    except Exception:
+        pass
+
+
+@receiver(post_delete, dispatch_uid='listing_remove_from_search_index')
+def remove_from_search_index_on_listing_delete(sender, instance, **kwargs):
+    try:
+        if sender.__name__ != 'Listing':
+            return
+        from .search import remove_listing
+        remove_listing(instance.pk)
+    except Exception:
+        pass
+
+
+@receiver(post_save, dispatch_uid='discogs_release_update_search_index')
+def update_release_search_index(sender, instance, update_fields=None, **kwargs):
+    """Index DiscogsRelease rows saved from the API (the dump importer indexes in bulk)."""
+    try:
+        if sender.__name__ != 'DiscogsRelease':
+            return
+        if update_fields and not {'artist', 'title', 'catno'} & set(update_fields):
+            # e.g. only fetched_at after a 304 revalidation
+            return
+        from .search import index_releases
+        index_releases([instance])
+    except Exception:
+        pass
+
+
+@receiver(post_save, dispatch_uid='listing_update_facet_counts')
+def update_facet_counts_on_listing_save(sender, instance, **kwargs):
+    """Apply the facet count delta between the previous and saved Listing."""
+    try:
+        if sender.__name__ != 'Listing':
+            return
+        from .facets import apply_change
+        apply_change(getattr(instance, '_previous', None), instance)
+    except Exception:
+        pass
+
+
+@receiver(post_delete, dispatch_uid='listing_update_facet_counts_on_delete')
+def update_facet_counts_on_listing_delete(sender, instance, **kwargs):
+    try:
+        if sender.__name__ != 'Listing':
+            return
+        from .facets import apply_change
+        apply_change(instance, None)
+    except Exception:
+        pass
+
+
+@receiver(post_save, dispatch_uid='listing_refresh_store_card')
+def refresh_store_card_on_listing_save(sender, instance, **kwargs):
+    """Keep the denormalized StoreCard in step with its Listing."""
+    try:
+        if sender.__name__ != 'Listing':
+            return
+        from .models import StoreCard
+        StoreCard.refresh(instance.pk)
+    except Exception:
+        pass
+
+
+@receiver(post_save, dispatch_uid='listing_bump_cache_version')
+def bump_cache_version_on_listing_save(sender, instance, **kwargs):
+    """Invalidate the listing's cached store fragments.
+
+    Connected after the StoreCard refresh so a fragment re-rendered under the
+    new version always sees the updated card. The featured strip is only
+    invalidated when the listing is, or was, featured.
+    """
+    try:
+        if sender.__name__ != 'Listing':
+            return
+        from .catalogue_cache import bump_listing
+        previous = getattr(instance, '_previous', None)
+        bump_listing(instance.pk, catalogue=instance.featured or bool(previous and previous.featured))
+    except Exception:
+        pass
+
+
+@receiver(post_delete, dispatch_uid='listing_bump_cache_version_on_delete')
+def bump_cache_version_on_listing_delete(sender, instance, **kwargs):
+    try:
+        if sender.__name__ != 'Listing':
+            return
+        from .catalogue_cache import bump_listing
+        bump_listing(instance.pk, catalogue=instance.featured)
+    except Exception:
+        pass
+
+
+@receiver(post_save, dispatch_uid='listingimage_refresh_store_card_on_save')
+@receiver(post_delete, dispatch_uid='listingimage_refresh_store_card_on_delete')
+def refresh_store_card_on_image_change(sender, instance, origin=None, **kwargs):
+    """Rebuild the owning listing's StoreCard when its images change.
+
+    Skipped when the delete cascades from the Listing itself: the card is
+    removed along with it and must not be recreated mid-delete.
+    """
+    try:
+        if sender.__name__ != 'ListingImage':
+            return
+        from .models import Listing, StoreCard
+        if isinstance(origin, Listing) or getattr(origin, 'model', None) is Listing:
+            return
+        StoreCard.refresh(instance.listing_id)
+        from .catalogue_cache import bump_listing
+        featured = StoreCard.objects.filter(pk=instance.listing_id, featured=True).exists()
+        bump_listing(instance.listing_id, catalogue=featured)
+    except Exception:
+        pass
+
+
+@receiver(post_save, dispatch_uid='unread_count_on_create')
+def update_unread_counts_on_create(sender, instance, created, **kwargs):
+    """Count a new Message/Reply as unread, or a new read marker as read (see accounts.unread)."""
+    try:
+        if not created:
+            return
+        from . import unread
+        handler = {
+            'Message': unread.message_created,
+            'Reply': unread.reply_created,
+            'MessageRead': unread.message_read,
+            'ReplyRead': unread.reply_read,
+        }.get(sender.__name__)
+        if handler is not None:
+            handler(instance)
+    except Exception:
+        pass
+
+
+@receiver(pre_delete, dispatch_uid='unread_count_on_delete')
+def update_unread_counts_on_delete(sender, instance, **kwargs):
+    """Uncount a Message/Reply for whoever hadn't read it yet.
+
+    Runs before the delete so its read markers can still be queried.
+    """
+    try:
+        from . import unread
+        if sender.__name__ == 'Message':
+            unread.message_deleted(instance)
+        elif sender.__name__ == 'Reply':
+            unread.reply_deleted(instance)
+    except Exception:
+        pass
+
+
+@receiver(post_save, dispatch_uid='unread_count_forget_on_user_save')
+def forget_unread_count_on_user_save(sender, instance, created, update_fields=None, **kwargs):
+    """Drop the user's counter when they may have changed staff status; it is recounted on next read."""
+    try:
+        from django.conf import settings
+        if sender._meta.label != settings.AUTH_USER_MODEL or created:
+            return
+        if update_fields and 'is_staff' not in update_fields:
+            # e.g. last_login on every sign-in
+            return
+        from .unread import forget
+        forget(instance.pk)
+    except Exception:
+        pass
+
+
+@receiver(post_save, dispatch_uid='basketitem_bump_basket_version')
+@receiver(post_delete, dispatch_uid='basketitem_bump_basket_version_on_delete')
+def bump_basket_version_on_item_change(sender, instance, **kwargs):
+    """Invalidate the owner's stored basket summary (see accounts.basket)."""
+    try:
+        if sender.__name__ != 'BasketItem':
+            return
+        from .basket import bump_user
+        bump_user(instance.basket.user_id)
     except Exception:
         pass
 
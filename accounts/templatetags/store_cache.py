@@ -0,0 +1,62 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+register = template.Library()
+
+# Stand-in rendered by {% csrf_token %} inside a cached fragment; swapped for
+# the current request's token on the way out so cached forms stay valid.
+CSRF_PLACEHOLDER = 'CACHED-FRAGMENT-CSRF-TOKEN'
+
+
+class VersionedCacheNode(template.Node):
+    def __init__(self, nodelist, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        from accounts.catalogue_cache import record_fragment
+
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        key = make_template_fragment_key(self.fragment_name, vary_on)
+        try:
+            content = cache.get(key)
+        except Exception:
+            content = None
+        record_fragment(self.fragment_name, content is not None)
+        if content is None:
+            with context.push(csrf_token=CSRF_PLACEHOLDER):
+                content = self.nodelist.render(context)
+            timeout = getattr(settings, 'STORE_FRAGMENT_CACHE_TIMEOUT', 60 * 60 * 24)
+            try:
+                cache.set(key, content, timeout)
+            except Exception:
+                pass
+        token = context.get('csrf_token')
+        return content.replace(CSRF_PLACEHOLDER, str(token) if token else '')
+
+
+@register.tag('versioned_cache')
+def do_versioned_cache(parser, token):
+    """Cache a fragment under a name plus version values, with no TTL logic.
+
+    Usage::
+
+        {% load store_cache %}
+        {% versioned_cache "store_card" card.pk card_version %}
+            ...
+        {% endversioned_cache %}
+
+    Callers pass versions from accounts.catalogue_cache; when one is bumped
+    the key changes and the fragment re-renders. Hits and misses are counted
+    per fragment name (see `manage.py store_cache_stats`).
+    """
+    nodelist = parser.parse(('endversioned_cache',))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires at least 1 argument.")
+    fragment_name = bits[1].strip('"\'')
+    return VersionedCacheNode(nodelist, fragment_name, [parser.compile_filter(b) for b in bits[2:]])
@@ -0,0 +1,457 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.base import SessionBase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template import engines
+from django.template.loader import render_to_string
+from django.test import RequestFactory, TestCase, override_settings
+
+from .models import DiscogsRelease, Listing
+
+TEST_CACHES = {
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'accounts-tests'},
+    'default': {
+        'BACKEND': 'config.cache.TwoTierCache',
+        'LOCATION': 'accounts-tests',
+        'OPTIONS': {'SHARED': 'shared'},
+    },
+}
+
+
+class _Session(SessionBase):
+    """An in-memory session, so loading it doesn't show up as a query."""
+
+    def load(self):
+        return {}
+
+    def exists(self, session_key):
+        return False
+
+    def create(self):
+        pass
+
+    def save(self, must_create=False):
+        pass
+
+    def delete(self, session_key=None):
+        pass
+
+
+@override_settings(CACHES=TEST_CACHES)
+class BadgeContextProcessorTests(TestCase):
+    """The navbar badges only cost queries on templates that show them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = get_user_model().objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        cls.listings = [
+            Listing.objects.create(artist='Artist', title=f'Title {i}', price=10, stock=5) for i in range(2)
+        ]
+
+    def _request(self, user, basket=None):
+        request = RequestFactory().get('/store/', HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        request.session = _Session()
+        if basket:
+            request.session['basket'] = basket
+        request.user = user
+        return request
+
+    def _guest_basket(self):
+        return {str(l.pk): 1 for l in self.listings}
+
+    def test_fragment_without_badges_runs_no_queries_for_guest_with_basket(self):
+        request = self._request(AnonymousUser(), self._guest_basket())
+        with self.assertNumQueries(0):
+            render_to_string('partials/store_cards.html', {'listings': []}, request=request)
+
+    def test_fragment_without_badges_runs_no_queries_for_staff(self):
+        request = self._request(self.staff)
+        with self.assertNumQueries(0):
+            render_to_string('partials/store_cards.html', {'listings': []}, request=request)
+
+    def test_badges_are_looked_up_once_per_request(self):
+        from .unread import unread_count
+
+        unread_count(self.staff)
+        template = engines['django'].from_string('{{ messages_count }}|{{ basket_count }}')
+        request = self._request(self.staff)
+        # The unread counter row and the (empty) basket
+        with self.assertNumQueries(2):
+            self.assertEqual(template.render({}, request), '0|0')
+        with self.assertNumQueries(0):
+            self.assertEqual(template.render({}, request), '0|0')
+
+    def test_guest_basket_badge_is_served_from_the_session(self):
+        template = engines['django'].from_string('{{ basket_count }}')
+        session = self._request(AnonymousUser(), self._guest_basket()).session
+        request = self._request(AnonymousUser())
+        request.session = session
+        with self.assertNumQueries(1):
+            self.assertEqual(template.render({}, request), '2')
+        # A later request with the same session and unchanged listings
+        request = self._request(AnonymousUser())
+        request.session = session
+        with self.assertNumQueries(0):
+            self.assertEqual(template.render({}, request), '2')
+
+    def test_forget_refreshes_the_badge_within_a_request(self):
+        from .basket import forget
+
+        template = engines['django'].from_string('{{ basket_count }}')
+        request = self._request(AnonymousUser(), {str(self.listings[0].pk): 1})
+        self.assertEqual(template.render({}, request), '1')
+        request.session['basket'][str(self.listings[1].pk)] = 1
+        forget(request)
+        self.assertEqual(template.render({}, request), '2')
+
+
+class ImportDiscogsDumpTests(TestCase):
+    """`import_discogs_dump` against the sample dump in scripts/."""
+
+    SAMPLE = os.path.join(settings.BASE_DIR, 'scripts', 'discogs_releases_sample.xml')
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.path = os.path.join(self.tmp, 'releases.xml')
+        shutil.copy(self.SAMPLE, self.path)
+
+    def _import(self, path=None, **options):
+        call_command('import_discogs_dump', path or self.path, stdout=StringIO(), **options)
+
+    def _ids(self):
+        return sorted(DiscogsRelease.objects.values_list('pk', flat=True))
+
+    def test_imports_accepted_physical_releases(self):
+        self._import()
+        # 4 is a file-only release and 5 a draft
+        self.assertEqual(self._ids(), [1, 2, 3, 6, 7])
+        release = DiscogsRelease.objects.get(pk=6)
+        self.assertEqual(release.source, DiscogsRelease.SOURCE_DUMP)
+        self.assertEqual((release.artist, release.year, release.country), ('Pink Floyd', 1973, 'UK'))
+        self.assertEqual(release.data['labels'][0]['catno'], 'SHVL 804')
+        self.assertFalse(os.path.exists(f'{self.path}.checkpoint'))
+
+    def test_imports_gzipped_dump(self):
+        gz_path = os.path.join(self.tmp, 'releases.xml.gz')
+        with open(self.SAMPLE, 'rb') as src, gzip.open(gz_path, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        self._import(gz_path)
+        self.assertEqual(self._ids(), [1, 2, 3, 6, 7])
+
+    def test_country_filter(self):
+        self._import(countries='uk, Sweden')
+        self.assertEqual(self._ids(), [1, 2, 6, 7])
+
+    def test_resumes_after_checkpoint(self):
+        with open(f'{self.path}.checkpoint', 'w') as fh:
+            json.dump({'last_id': 3, 'imported': 3}, fh)
+        self._import()
+        self.assertEqual(self._ids(), [6, 7])
+        self.assertFalse(os.path.exists(f'{self.path}.checkpoint'))
+
+    def test_restart_ignores_checkpoint(self):
+        with open(f'{self.path}.checkpoint', 'w') as fh:
+            json.dump({'last_id': 3, 'imported': 3}, fh)
+        self._import(restart=True)
+        self.assertEqual(self._ids(), [1, 2, 3, 6, 7])
+
+    def test_reimport_updates_rows_in_place(self):
+        self._import()
+        DiscogsRelease.objects.filter(pk=7).update(title='Stale')
+        self._import()
+        self.assertEqual(self._ids(), [1, 2, 3, 6, 7])
+        self.assertEqual(DiscogsRelease.objects.get(pk=7).title, 'Hounds Of Love')
+
+    def test_reimport_keeps_api_payloads(self):
+        self._import()
+        DiscogsRelease.objects.filter(pk=7).update(title='From the API', source=DiscogsRelease.SOURCE_API)
+        self._import()
+        self.assertEqual(DiscogsRelease.objects.get(pk=7).title, 'From the API')
+
+    def test_fills_search_index(self):
+        from .search import release_matching_ids
+
+        self._import()
+        for query, expected in (('Floyd', [6]), ('Hounds', [7]), ('SK032', [1])):
+            found = DiscogsRelease.objects.filter(pk__in=release_matching_ids(query)).values_list('pk', flat=True)
+            self.assertEqual(sorted(found), expected, query)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class KeysetPaginationTests(TestCase):
+    """Walking the store's cursors visits every row once, in store order."""
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(7):
+            Listing.objects.create(artist='Artist', title=f'Title {i}', price=10, stock=1, featured=i % 3 == 0)
+        # Ties on created_at are broken by pk
+        Listing.objects.filter(title__in=['Title 1', 'Title 2', 'Title 4']).update(
+            created_at=Listing.objects.get(title='Title 1').created_at,
+        )
+
+    def test_pages_cover_the_ordering_without_repeats(self):
+        from .pagination import STORE_ORDERING, keyset_page
+
+        expected = list(Listing.objects.order_by(*STORE_ORDERING).values_list('pk', flat=True))
+        seen, cursor = [], None
+        while True:
+            items, cursor = keyset_page(Listing.objects.all(), cursor, page_size=2)
+            seen.extend(item.pk for item in items)
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+
+    def test_bad_cursor_starts_from_the_first_page(self):
+        from .pagination import keyset_page
+
+        first, _ = keyset_page(Listing.objects.all(), None, page_size=2)
+        again, _ = keyset_page(Listing.objects.all(), 'not-a-cursor', page_size=2)
+        self.assertEqual(again, first)
+
+    def test_last_page_has_no_cursor(self):
+        from .pagination import keyset_page
+
+        items, cursor = keyset_page(Listing.objects.all(), None, page_size=7)
+        self.assertEqual(len(items), 7)
+        self.assertIsNone(cursor)
+
+
+# The full store page renders static URLs, which the manifest storage can't
+# resolve before collectstatic has run
+@override_settings(CACHES=TEST_CACHES, STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class StoreConditionalGetTests(TestCase):
+    """Anonymous store requests are answered 304 until the catalogue changes."""
+
+    def setUp(self):
+        cache.clear()
+        self.listing = Listing.objects.create(artist='Artist', title='Title', price=10, stock=1)
+
+    def _get(self, **headers):
+        # secure: production settings redirect plain HTTP
+        return self.client.get('/store/', secure=True, **headers)
+
+    def test_unchanged_store_is_not_modified(self):
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        response = self._get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_listing_change_revalidates(self):
+        etag = self._get()['ETag']
+        self.listing.price = 12
+        self.listing.save()
+        response = self._get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_signed_in_users_are_not_served_conditionally(self):
+        user = get_user_model().objects.create_user('buyer', 'buyer@example.com', 'pw')
+        self.client.force_login(user)
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class RateLimiterTests(TestCase):
+    def setUp(self):
+        from integrations.ratelimit import RateLimiter
+
+        cache.clear()
+        # A long period, so the test can't straddle two windows
+        self.limiter = RateLimiter('tests', 3, period=3600)
+
+    def test_allows_up_to_the_limit(self):
+        self.assertEqual([self.limiter.try_acquire() for _ in range(3)], [0, 0, 0])
+        self.assertGreater(self.limiter.try_acquire(), 0)
+
+    def test_refused_calls_use_no_quota(self):
+        for _ in range(3):
+            self.limiter.try_acquire()
+        for _ in range(5):
+            self.limiter.try_acquire()
+        _, _, current_key = self.limiter.keys(time.time())
+        self.assertEqual(cache.get(current_key), 3)
+
+    def test_acquire_raises_when_nothing_frees_up_in_time(self):
+        from integrations.ratelimit import RateLimited
+
+        for _ in range(3):
+            self.limiter.acquire()
+        with self.assertRaises(RateLimited) as raised:
+            self.limiter.acquire(wait=0.01)
+        self.assertGreater(raised.exception.retry_after, 0)
+
+    def test_block_refuses_every_call(self):
+        self.limiter.block(30)
+        self.assertGreater(self.limiter.try_acquire(), 25)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CircuitBreakerTests(TestCase):
+    def setUp(self):
+        from integrations.circuitbreaker import CircuitBreaker
+
+        cache.clear()
+        self.breaker = CircuitBreaker('tests', threshold=2, cooldown=30)
+
+    def _cool_down(self):
+        cache.set(self.breaker._key('opened_at'), time.time() - 31, None)
+
+    def test_opens_after_threshold_failures(self):
+        from integrations.circuitbreaker import CircuitOpen
+
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state()['state'], 'open')
+        with self.assertRaises(CircuitOpen):
+            self.breaker.allow()
+
+    def test_half_open_lets_one_trial_through(self):
+        from integrations.circuitbreaker import CircuitOpen
+
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self._cool_down()
+        self.assertEqual(self.breaker.state()['state'], 'half-open')
+        self.assertTrue(self.breaker.allow())
+        with self.assertRaises(CircuitOpen):
+            self.breaker.allow()
+        # A trial given up without a call frees the slot
+        self.breaker.release_trial()
+        self.assertTrue(self.breaker.allow())
+
+    def test_trial_outcome_closes_or_reopens(self):
+        from integrations.circuitbreaker import CircuitOpen
+
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self._cool_down()
+        self.breaker.allow()
+        self.breaker.record_failure()
+        with self.assertRaises(CircuitOpen):
+            self.breaker.allow()
+        self._cool_down()
+        self.breaker.allow()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state()['state'], 'closed')
+        self.assertFalse(self.breaker.allow())
+
+
+@override_settings(CACHES=TEST_CACHES)
+class TokenPoolTests(TestCase):
+    def setUp(self):
+        from integrations.tokenpool import TokenPool
+
+        cache.clear()
+        self.pool = TokenPool(['token-a', 'token-b'], limit=2, period=3600)
+
+    def test_spreads_calls_over_the_pool(self):
+        from integrations.ratelimit import RateLimited
+
+        used = sorted(self.pool.acquire() for _ in range(4))
+        self.assertEqual(used, ['token-a', 'token-a', 'token-b', 'token-b'])
+        self.assertEqual(self.pool.headroom(), {'token-a': 0, 'token-b': 0})
+        with self.assertRaises(RateLimited):
+            self.pool.acquire(wait=0.01)
+
+    def test_429_ejects_the_token(self):
+        self.pool.report('token-a', 429, None, '30')
+        self.assertEqual([self.pool.acquire(), self.pool.acquire()], ['token-b', 'token-b'])
+        self.assertFalse(self.pool.has_spare(0))
+
+    def test_401_never_ejects_the_last_usable_token(self):
+        self.pool.report('token-a', 401, None, None)
+        self.pool.report('token-b', 401, None, None)
+        self.assertEqual(self.pool.headroom(), {'token-a': 0, 'token-b': 2})
+
+    def test_reported_remaining_caps_headroom(self):
+        self.pool.report('token-a', 200, '1', None)
+        self.assertEqual(self.pool.headroom()['token-a'], 1)
+        self.assertTrue(self.pool.has_spare(0.5))
+        self.assertFalse(self.pool.has_spare(0.75))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class StaleWhileRevalidateTests(TestCase):
+    """integrations.discogs._lookup serves cached payloads before calling out."""
+
+    KEY = 'discogs:release:1'
+
+    def setUp(self):
+        cache.clear()
+        self.calls = []
+        patcher = mock.patch('integrations.discogs._refresh_in_background')
+        self.background = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _fetch(self, result):
+        from integrations import discogs
+
+        def fetch(key, budget):
+            self.calls.append(key)
+            if isinstance(result, dict):
+                discogs._cache_set(key, result, 60)
+            return result
+        return fetch
+
+    def _lookup(self, result):
+        from integrations import discogs
+
+        return discogs._lookup(self.KEY, self._fetch(result), default='default')
+
+    def test_fresh_payload_is_served_without_a_call(self):
+        from integrations import discogs
+
+        discogs._cache_set(self.KEY, {'v': 1}, 60)
+        self.assertEqual(self._lookup({'v': 2}), {'v': 1})
+        self.assertEqual(self.calls, [])
+        self.background.assert_not_called()
+
+    def test_stale_payload_is_served_and_refreshed_in_the_background(self):
+        from integrations import discogs
+
+        discogs._cache_set(self.KEY, {'v': 1}, 60)
+        envelope = cache.get(self.KEY)
+        envelope['soft_expires'] = time.time() - 1
+        cache.set(self.KEY, envelope)
+        self.assertEqual(self._lookup({'v': 2}), {'v': 1})
+        self.assertEqual(self.calls, [])
+        self.assertEqual(self.background.call_args[0][0], self.KEY)
+
+    def test_miss_fetches_inline_and_caches(self):
+        self.assertEqual(self._lookup({'v': 2}), {'v': 2})
+        self.assertEqual(self.calls, [self.KEY])
+        self.assertEqual(self._lookup({'v': 3}), {'v': 2})
+        self.assertEqual(self.calls, [self.KEY])
+
+    def test_failed_fetch_falls_back_to_last_known_good(self):
+        from integrations import discogs
+
+        discogs._cache_set(self.KEY, {'v': 1}, 60)
+        cache.delete(self.KEY)
+        self.assertEqual(self._lookup(None), {'v': 1})
+        self.background.assert_called_once()
+
+    def test_failed_fetch_without_a_copy_gives_the_default(self):
+        self.assertEqual(self._lookup(None), 'default')
+
+    def test_negative_entry_gives_the_default_without_a_call(self):
+        cache.set(self.KEY, {'__discogs__': 1, 'missing': 404, 'fetched_at': time.time()})
+        self.assertEqual(self._lookup({'v': 2}), 'default')
+        self.assertEqual(self.calls, [])
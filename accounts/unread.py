@@ -0,0 +1,161 @@
+"""Incrementally maintained unread counts for the navbar messages badge.
+
+What counts as unread for a user:
+
+- staff: every Message, and every Reply written by a guest or a non-staff
+  user, that they have no MessageRead/ReplyRead marker for;
+- everyone else: their own Messages, and staff Replies on them, that they
+  have no marker for.
+
+Counts live in the UnreadCounter table, one row per user, so the badge is a
+single primary-key lookup. The signal handlers in accounts.signals adjust
+them in the same transaction as the Message, Reply or read marker being
+written. A user's row is created from a full count the first time it is
+read and dropped when their staff status changes. `manage.py
+reconcile_unread` recomputes every row from scratch (e.g. after bulk
+deletes or imports that bypass signals).
+"""
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+
+
+def _bump(users, delta):
+    """Add `delta` to the existing counters of `users` (a queryset or a list of ids)."""
+    from .models import UnreadCounter
+
+    if isinstance(users, (list, tuple, set)):
+        qs = UnreadCounter.objects.filter(user_id__in=users)
+    else:
+        qs = UnreadCounter.objects.filter(user__in=users)
+    if delta < 0:
+        # Never go below zero, even if a row drifted
+        qs = qs.filter(count__gte=-delta)
+    qs.update(count=F('count') + delta)
+
+
+def _staff():
+    return get_user_model().objects.filter(is_staff=True)
+
+
+def _owner_reader(message):
+    """The non-staff owner of `message`, who counts it and its staff replies, or None."""
+    owner = message.user
+    return owner if owner is not None and not owner.is_staff else None
+
+
+def _counts_reply_for_staff(reply):
+    return reply.user_id is None or not reply.user.is_staff
+
+
+def message_created(message):
+    with transaction.atomic():
+        _bump(_staff(), 1)
+        owner = _owner_reader(message)
+        if owner is not None:
+            _bump([owner.pk], 1)
+
+
+def reply_created(reply):
+    with transaction.atomic():
+        if _counts_reply_for_staff(reply):
+            _bump(_staff(), 1)
+        else:
+            owner = _owner_reader(reply.message)
+            if owner is not None:
+                _bump([owner.pk], 1)
+
+
+def _message_counts_for(message, user):
+    return user.is_staff or (message.user_id == user.pk)
+
+
+def _reply_counts_for(reply, user):
+    if user.is_staff:
+        return _counts_reply_for_staff(reply)
+    return reply.message.user_id == user.pk and reply.user_id is not None and reply.user.is_staff
+
+
+def message_read(read):
+    """A MessageRead marker was created."""
+    if _message_counts_for(read.message, read.user):
+        _bump([read.user_id], -1)
+
+
+def reply_read(read):
+    """A ReplyRead marker was created."""
+    if _reply_counts_for(read.reply, read.user):
+        _bump([read.user_id], -1)
+
+
+def _unread_readers(counted_for_staff, owner, read_user_ids):
+    readers = set()
+    if counted_for_staff:
+        readers.update(_staff().exclude(pk__in=read_user_ids).values_list('pk', flat=True))
+    if owner is not None and owner.pk not in read_user_ids:
+        readers.add(owner.pk)
+    return readers
+
+
+def message_deleted(message):
+    """Called before `message` (and with it its replies) is deleted."""
+    read_by = set(message.reads.values_list('user_id', flat=True))
+    _bump(_unread_readers(True, _owner_reader(message), read_by), -1)
+
+
+def reply_deleted(reply):
+    read_by = set(reply.reads.values_list('user_id', flat=True))
+    counted_for_staff = _counts_reply_for_staff(reply)
+    owner = None if counted_for_staff else _owner_reader(reply.message)
+    _bump(_unread_readers(counted_for_staff, owner, read_by), -1)
+
+
+def count_for(user):
+    """Count `user`'s unread messages and replies from the message tables."""
+    from .models import Message, Reply
+
+    if user.is_staff:
+        replies = Reply.objects.filter(Q(user__isnull=True) | Q(user__is_staff=False))
+        messages = Message.objects.all()
+    else:
+        replies = Reply.objects.filter(message__user=user, user__is_staff=True)
+        messages = Message.objects.filter(user=user)
+    return replies.exclude(reads__user=user).count() + messages.exclude(reads__user=user).count()
+
+
+def unread_count(user):
+    """Return the badge count for `user`: one primary-key lookup once the row exists."""
+    from .models import UnreadCounter
+
+    count = UnreadCounter.objects.filter(pk=user.pk).values_list('count', flat=True).first()
+    if count is not None:
+        return count
+    count = count_for(user)
+    try:
+        with transaction.atomic():
+            UnreadCounter.objects.create(user=user, count=count)
+    except IntegrityError:
+        # Created concurrently by another request; both started from the truth
+        pass
+    return count
+
+
+def forget(user_id):
+    """Drop a user's counter; it is recounted the next time it is read."""
+    from .models import UnreadCounter
+
+    UnreadCounter.objects.filter(pk=user_id).delete()
+
+
+def reconcile():
+    """Recompute the counters of every user that has one. Returns rows corrected."""
+    from .models import UnreadCounter
+
+    corrected = 0
+    for counter in UnreadCounter.objects.select_related('user').iterator():
+        with transaction.atomic():
+            count = count_for(counter.user)
+            if count != counter.count:
+                UnreadCounter.objects.filter(pk=counter.pk).update(count=count)
+                corrected += 1
+    return corrected
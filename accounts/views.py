@@ -5,6 +5,10 @@ from django.contrib.auth.views import LoginView
 from django.contrib.auth.decorators import login_required, user_passes_test
 from integrations.discogs import search as discogs_search_api, get_release as discogs_get_release
 from integrations.discogs import price_suggestions as discogs_price_suggestions
+from integrations.discogs import release_cache_key, price_suggestions_cache_key
+from integrations.discogs import metrics_snapshot, reset_metrics, token_pool as discogs_token_pool
+from integrations.discogs import circuit as discogs_circuit
+from integrations.discogs import enrich_releases as enrich_discogs_releases
 from django.http import JsonResponse
 from django.urls import reverse
 from django.contrib import messages
@@ -19,7 +23,14 @@ from .models import (
     MessageRead, ReplyRead,
 )
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Q
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
+from .conditional import store_etag, store_last_modified, discogs_conditional
+
+_price_suggestions_etag, _price_suggestions_last_modified = discogs_conditional(price_suggestions_cache_key)
+_release_details_etag, _release_details_last_modified = discogs_conditional(release_cache_key)
 
 
 def staff_required(view_func):
@@ -52,17 +63,19 @@ def contact_view(request):
                 msg.user = request.user
                 # populate username automatically for authenticated users
                 msg.username = request.user.username
-            msg.save()
+            with transaction.atomic():
+                msg.save()
 
-            # Mark the message as read for the sender (if a registered user).
-            # Without this, the context processor counts the owner's own message
-            # as "unread" because there is no MessageRead record for them.
-            try:
-                if msg.user:
-                    MessageRead.objects.create(message=msg, user=msg.user, read_at=timezone.now())
-            except Exception:
-                # best-effort; don't block saving the message on read-marker failures
-                pass
+                # Mark the message as read for the sender (if a registered user).
+                # Without this, the context processor counts the owner's own message
+                # as "unread" because there is no MessageRead record for them.
+                try:
+                    if msg.user:
+                        with transaction.atomic():
+                            MessageRead.objects.create(message=msg, user=msg.user, read_at=timezone.now())
+                except Exception:
+                    # best-effort; don't block saving the message on read-marker failures
+                    pass
 
             # Save uploaded images when present and when subject == selling
             files = form.cleaned_data.get('images') or []
@@ -145,7 +158,22 @@ class CustomLoginView(LoginView):
 @staff_required
 def manage_landing(request):
     """Front-facing manage landing for staff tools."""
-    return render(request, 'manage.html')
+    return render(request, 'manage.html', {'discogs_circuit': discogs_circuit.state()})
+
+
+@login_required
+@staff_required
+def discogs_metrics_view(request):
+    """Discogs client metrics aggregated across workers (see integrations.metrics)."""
+    if request.method == 'POST' and request.POST.get('reset'):
+        reset_metrics()
+        messages.success(request, 'Discogs metrics reset.')
+        return redirect(reverse('discogs_metrics'))
+    if request.method == 'POST' and request.POST.get('close_circuit'):
+        discogs_circuit.reset()
+        messages.success(request, 'Discogs circuit breaker closed.')
+        return redirect(reverse('discogs_metrics'))
+    return render(request, 'discogs_metrics.html', metrics_snapshot())
 
 
 @login_required
@@ -263,19 +291,23 @@ def message_thread(request, pk: int):
         # if guest message, show a read-only view instructing to use email/phone
         return render(request, 'messages_thread.html', {'message': msg, 'can_reply': False})
 
-    # Mark the message thread as read for the current user (per-user marker)
+    # Mark the message thread as read for the current user (per-user marker).
+    # The user's unread counter is decremented in the same transaction by
+    # the signal handlers (see accounts.unread).
     try:
-        mr, _ = MessageRead.objects.get_or_create(message=msg, user=request.user)
-        mr.mark_read()
+        with transaction.atomic():
+            mr, _ = MessageRead.objects.get_or_create(message=msg, user=request.user)
+            mr.mark_read()
     except Exception:
         # best-effort; don't block the thread view on DB issues
         pass
 
     # Mark any replies authored by others as read for the current user
     try:
-        for r in msg.replies.exclude(user=request.user):
-            if not r.reads.filter(user=request.user).exists():
-                ReplyRead.objects.create(reply=r, user=request.user, read_at=timezone.now())
+        with transaction.atomic():
+            for r in msg.replies.exclude(user=request.user):
+                if not r.reads.filter(user=request.user).exists():
+                    ReplyRead.objects.create(reply=r, user=request.user, read_at=timezone.now())
     except Exception:
         pass
 
@@ -298,12 +330,14 @@ def message_thread(request, pk: int):
         form = ReplyForm(request.POST, files=request.FILES or None)
         if form.is_valid():
             try:
-                r = Reply.objects.create(user=request.user, message=msg, body=form.cleaned_data['body'])
-                # mark the new reply as read for the author
-                try:
-                    ReplyRead.objects.create(reply=r, user=request.user, read_at=timezone.now())
-                except Exception:
-                    pass
+                with transaction.atomic():
+                    r = Reply.objects.create(user=request.user, message=msg, body=form.cleaned_data['body'])
+                    # mark the new reply as read for the author
+                    try:
+                        with transaction.atomic():
+                            ReplyRead.objects.create(reply=r, user=request.user, read_at=timezone.now())
+                    except Exception:
+                        pass
                 files = form.cleaned_data.get('images') or []
                 for f in files:
                     ri = ReplyImage(reply=r)
@@ -497,6 +531,34 @@ def delete_selected_messages(request):
     return redirect('messages')
 
 
+def _local_stock(release_ids):
+    """Return ``{release_id: {'listings', 'in_stock', 'units', 'price'}}`` for our listings.
+
+    One grouped ``release_id IN (...)`` query on the indexed column. A
+    listing is in stock when its stock is unknown (null) or positive;
+    `units` counts only known stock and `price` is the cheapest in-stock one.
+    """
+    from django.db.models import Count, Min, Sum
+    from .models import Listing
+
+    ids = {int(r) for r in release_ids if r and str(r).isdigit()}
+    if not ids:
+        return {}
+    available = Q(stock__isnull=True) | Q(stock__gt=0)
+    rows = (
+        Listing.objects.filter(release_id__in=ids)
+        .order_by()
+        .values('release_id')
+        .annotate(
+            listings=Count('pk'),
+            in_stock=Count('pk', filter=available),
+            units=Sum('stock', filter=Q(stock__gt=0)),
+            price=Min('price', filter=available),
+        )
+    )
+    return {row['release_id']: row for row in rows}
+
+
 @login_required
 @staff_required
 def discogs_search(request):
@@ -514,22 +576,22 @@ def discogs_search(request):
     pagination = {}
     if query:
         # Call the Discogs API helper. It will use Django cache and handle
-        # retries/backoff. Ensure DISCOGS_TOKEN is set in the environment.
+        # retries/backoff. Ensure DISCOGS_TOKEN (or DISCOGS_TOKENS) is set in the environment.
         try:
             # Request pagination info so we can present prev/next links
-            maybe = discogs_search_api(
+            raw_results, pagination = discogs_search_api(
                 query, page=page, per_page=12, year=filter_year, format_=filter_format, country=filter_country, return_pagination=True
             )
-            if isinstance(maybe, tuple):
-                raw_results, pagination = maybe
-            else:
-                raw_results = maybe
-                pagination = {}
         except Exception:
             raw_results = []
             pagination = {}
 
-        # Build result cards from the search response only (avoid N+1 remote calls)
+        # Build result cards from the search response only (avoid N+1 remote
+        # calls); details already in the cache are filled in with one lookup
+        # and the page asks discogs_enrich_view for the rest.
+        cached_details = _enrichment_json(enrich_discogs_releases(
+            [r.get('id') for r in (raw_results or [])], cached_only=True
+        ))
         results = []
         # collect raw items first so we can apply a secondary ordering
         raw_items = []
@@ -562,7 +624,15 @@ def discogs_search(request):
                 'thumb': r.get('thumb', ''),
                 'resource_url': r.get('resource_url'),
                 'release_id': release_id,
+                'enriched': False,
             }
+            details = cached_details.get(str(release_id))
+            if details and details['complete']:
+                item['artist'] = details.get('artist') or item['artist']
+                item['release_notes'] = details.get('notes', '')
+                item['formats_lines'] = details.get('formats_lines') or item['formats_lines']
+                item['suggested_price'] = details['suggested_price']
+                item['enriched'] = True
 
             # Apply the same post-filters (year, format, country) against the
             # lightweight item to ensure the UI only shows matching cards.
@@ -630,7 +700,11 @@ def discogs_search(request):
             ordered.extend(sorted_group)
 
         results = ordered
-    has_token = bool(__import__('os').environ.get('DISCOGS_TOKEN'))
+        # Flag the hits we already list, with stock and price
+        local_stock = _local_stock([it.get('release_id') for it in results])
+        for it in results:
+            it['local'] = local_stock.get(it.get('release_id'))
+    has_token = bool(discogs_token_pool.tokens)
     # ensure results is a list to avoid NoneType issues when checking length
     if results is None:
         results = []
@@ -667,10 +741,12 @@ def discogs_search(request):
 
 @login_required
 @staff_required
+@condition(etag_func=_price_suggestions_etag, last_modified_func=_price_suggestions_last_modified)
 def discogs_price_suggestions_view(request, release_id: int):
     """Proxy endpoint to fetch Discogs price suggestions for a release.
 
-    Returns cached JSON from the integrations helper.
+    Returns cached JSON from the integrations helper. Repeat requests for an
+    unchanged cached payload are answered 304.
     """
     data = {}
     try:
@@ -683,56 +759,118 @@ def discogs_price_suggestions_view(request, release_id: int):
 
 @login_required
 @staff_required
+@condition(etag_func=_release_details_etag, last_modified_func=_release_details_last_modified)
 def discogs_release_details_view(request, release_id: int):
     """Return minimal release details (notes) as JSON for on-demand fetching."""
     data = {'notes': ''}
     try:
         rel = discogs_get_release(int(release_id))
         if rel:
-            raw = rel.get('notes') or ''
-            # Instead of stripping URL BBCode completely (which made some
-            # surrounding text look odd after removal), mark URL blocks so
-            # the UI can highlight them for manual deletion. We replace
-            # [url=...]text[/url] and [url]text[/url] with a visible token
-            # like [[REMOVE:text]] so the frontend can style it.
-            note = raw
-            try:
-                # replace [url=...]text[/url] -> [[REMOVE:text]] (keep inner text)
-                note = re.sub(r"\[url=[^\]]*\](.*?)\[/url\]", r"[[REMOVE:\1]]", note, flags=re.IGNORECASE|re.DOTALL)
-                # replace [url]text[/url]
-                note = re.sub(r"\[url\](.*?)\[/url\]", r"[[REMOVE:\1]]", note, flags=re.IGNORECASE|re.DOTALL)
-                # replace image tags with a small marker
-                note = re.sub(r"\[img\].*?\[/img\]", "[[REMOVE:image]]", note, flags=re.IGNORECASE|re.DOTALL)
-                # remove simple BBCode tags like [b], [i], [u], [size], [quote]
-                note = re.sub(r"\[((?:b|i|u|size|quote))(?:=[^\]]*)?\](.*?)\[/\1\]", r"\2", note, flags=re.IGNORECASE|re.DOTALL)
-            except Exception:
-                note = raw
-
-            # collapse repeated whitespace and trim
-            note = re.sub(r"\s+", " ", note).strip()
-            data['notes'] = note
-            # build formats_lines similarly to the previous detailed view
-            formats_lines = []
-            for f in rel.get('formats', []):
-                parts = []
-                name = f.get('name')
-                if name:
-                    parts.append(name)
-                text = f.get('text')
-                if text:
-                    parts.append(text)
-                descs = f.get('descriptions') or []
-                if descs:
-                    parts.append(', '.join(descs))
-                line = ' — '.join([p for p in parts if p])
-                if line:
-                    formats_lines.append(line)
-            data['formats_lines'] = formats_lines
+            data = _release_details(rel)
     except Exception:
         data['notes'] = ''
     return JsonResponse(data)
 
 
+def _release_details(rel):
+    """Return ``{'notes', 'formats_lines'}`` for a Discogs release payload."""
+    data = {}
+    raw = rel.get('notes') or ''
+    # Instead of stripping URL BBCode completely (which made some
+    # surrounding text look odd after removal), mark URL blocks so
+    # the UI can highlight them for manual deletion. We replace
+    # [url=...]text[/url] and [url]text[/url] with a visible token
+    # like [[REMOVE:text]] so the frontend can style it.
+    note = raw
+    try:
+        # replace [url=...]text[/url] -> [[REMOVE:text]] (keep inner text)
+        note = re.sub(r"\[url=[^\]]*\](.*?)\[/url\]", r"[[REMOVE:\1]]", note, flags=re.IGNORECASE|re.DOTALL)
+        # replace [url]text[/url]
+        note = re.sub(r"\[url\](.*?)\[/url\]", r"[[REMOVE:\1]]", note, flags=re.IGNORECASE|re.DOTALL)
+        # replace image tags with a small marker
+        note = re.sub(r"\[img\].*?\[/img\]", "[[REMOVE:image]]", note, flags=re.IGNORECASE|re.DOTALL)
+        # remove simple BBCode tags like [b], [i], [u], [size], [quote]
+        note = re.sub(r"\[((?:b|i|u|size|quote))(?:=[^\]]*)?\](.*?)\[/\1\]", r"\2", note, flags=re.IGNORECASE|re.DOTALL)
+    except Exception:
+        note = raw
+
+    # collapse repeated whitespace and trim
+    note = re.sub(r"\s+", " ", note).strip()
+    data['notes'] = note
+    # build formats_lines similarly to the previous detailed view
+    formats_lines = []
+    for f in rel.get('formats', []):
+        parts = []
+        name = f.get('name')
+        if name:
+            parts.append(name)
+        text = f.get('text')
+        if text:
+            parts.append(text)
+        descs = f.get('descriptions') or []
+        if descs:
+            parts.append(', '.join(descs))
+        line = ' — '.join([p for p in parts if p])
+        if line:
+            formats_lines.append(line)
+    data['formats_lines'] = formats_lines
+    return data
+
+
+# Condition whose Discogs price suggestion is shown on search cards
+SUGGESTED_PRICE_CONDITION = 'Very Good Plus (VG+)'
+
+
+def _suggested_price(suggestions):
+    """Return ``"<value> <currency>"`` for SUGGESTED_PRICE_CONDITION, or ''."""
+    entry = (suggestions or {}).get(SUGGESTED_PRICE_CONDITION) or {}
+    try:
+        return f"{float(entry['value']):.2f} {entry.get('currency', '')}".strip()
+    except (KeyError, TypeError, ValueError):
+        return ''
+
+
+def _enrichment_json(enriched):
+    """Shape `integrations.discogs.enrich_releases` output for the search cards."""
+    out = {}
+    for release_id, parts in enriched.items():
+        rel = parts.get('release')
+        item = {
+            'suggested_price': _suggested_price(parts.get('price_suggestions')),
+            # False when either lookup is still missing from the cache; a
+            # release Discogs doesn't know is as complete as it will get
+            'complete': (rel is not None or bool(parts.get('not_found'))) and parts.get('price_suggestions') is not None,
+        }
+        if rel:
+            item.update(_release_details(rel))
+            item['artist'] = ', '.join(a.get('name') for a in rel.get('artists', []) if a.get('name'))
+        out[str(release_id)] = item
+    return out
+
+
+# Most release ids accepted by one batch enrichment request (two pages of hits)
+ENRICH_MAX_IDS = 24
+
+
+@login_required
+@staff_required
+def discogs_enrich_view(request):
+    """Batch JSON for search cards: details and suggested price per release id.
+
+    ``?ids=1,2,3``. Ids whose lookups didn't finish within the enrichment
+    budget are listed in ``pending`` so the page can ask again for them.
+    """
+    ids = []
+    for part in request.GET.get('ids', '').split(','):
+        part = part.strip()
+        if part.isdigit() and part not in ids:
+            ids.append(part)
+    ids = ids[:ENRICH_MAX_IDS]
+    enriched = _enrichment_json(enrich_discogs_releases(ids))
+    pending = [rid for rid in ids if rid not in enriched]
+    return JsonResponse({'releases': enriched, 'pending': pending})
+
+
 @login_required
 @staff_required
 def create_listing(request):
@@ -827,6 +965,7 @@ def create_listing(request):
             price=price_val,
             # Use the release_id (if any) as the resource reference rather than accepting arbitrary resource_url via GET
             resource_url=str(release_id) if release_id else '',
+            release_id=int(release_id) if release_id and release_id.isdigit() else None,
             stock=stock_val,
             thumb=pdata.get('thumb', ''),
             created_by=request.user if request.user.is_authenticated else None,
@@ -1017,53 +1156,114 @@ def listing_toggle_featured(request, pk: int):
     return redirect(reverse('listing_list'))
 
 
+@vary_on_headers('X-Requested-With')
+@condition(etag_func=store_etag, last_modified_func=store_last_modified)
 def store_list(request):
-    """Public store page: featured first, then all listings with filters."""
-    from .models import Listing
+    """Public store page: featured first, then all listings with filters.
+
+    Cards are read from the denormalized StoreCard table, so each section is
+    a single query with no per-card lookups. Listings are paginated with a
+    keyset cursor (see accounts.pagination). AJAX "load more" requests
+    receive the next batch of rendered cards and the cursor for the batch
+    after it as JSON. Anonymous repeat requests are answered 304 while the
+    catalogue version is unchanged (see accounts.conditional).
+    """
+    from .models import StoreCard
+    from .pagination import keyset_page
 
     artist_q = request.GET.get('artist', '').strip()
     title_q = request.GET.get('title', '').strip()
     format_q = request.GET.get('format', '').strip()
-
-    # Only include featured items that are not explicitly out of stock
-    try:
-        from django.db import models as djmodels
-        featured = Listing.objects.filter(featured=True).filter(
-            djmodels.Q(stock__isnull=True) | djmodels.Q(stock__gt=0)
-        ).order_by('-created_at')[:8]
-    except Exception:
-        # If the DB schema doesn't yet have stock, fall back
-        featured = Listing.objects.filter(featured=True).order_by('-created_at')[:8]
+    condition_q = request.GET.get('condition', '').strip()
+    decade_q = request.GET.get('decade', '').strip()
+    country_q = request.GET.get('country', '').strip()
+    cursor = request.GET.get('cursor', '').strip()
+    is_ajax = request.headers.get('x-requested-with') == 'XMLHttpRequest'
 
     # Previously we excluded featured items from the All listings section to
     # avoid duplicate DOM nodes. Templates now render unique overlay ids so
     # it's fine to show featured items in the main listings as well (helpful
     # for users who browse straight to the store). Keep featured items sorted
-    # to the top of the list.
-    qs = Listing.objects.order_by('-featured', '-created_at')
-    if artist_q:
-        qs = qs.filter(artist__icontains=artist_q)
-    if title_q:
-        qs = qs.filter(title__icontains=title_q)
-    if format_q:
-        qs = qs.filter(formats__icontains=format_q)
-
-    # Hide listings that are explicitly out of stock (stock == 0)
-    try:
-        from django.db import models as djmodels
-        qs = qs.filter(djmodels.Q(stock__isnull=True) | djmodels.Q(stock__gt=0))
-    except Exception:
-        # If the DB schema doesn't have stock yet, ignore the filter
-        pass
+    # to the top of the list. Listings that are explicitly out of stock
+    # (stock == 0) are hidden.
+    qs = StoreCard.objects.filter(in_stock=True)
+    if artist_q or title_q or format_q:
+        # Matched through the full-text index (see accounts.search); the
+        # store keeps its own cursor ordering so pages stay stable.
+        from .search import matching_ids
+        qs = qs.filter(pk__in=matching_ids(artist=artist_q, title=title_q, formats=format_q))
+    if condition_q:
+        qs = qs.filter(condition=condition_q)
+    if decade_q:
+        try:
+            decade = int(decade_q)
+            qs = qs.filter(year__gte=decade, year__lt=decade + 10)
+        except ValueError:
+            decade_q = ''
+    if country_q:
+        qs = qs.filter(country__iexact=country_q)
+
+    listings, next_cursor = keyset_page(qs, cursor)
 
-    listings = qs
+    # Card fragments are cached per listing version (see accounts.catalogue_cache)
+    from .catalogue_cache import listing_versions
+    catalogue_version, versions = listing_versions([l.pk for l in listings])
+    for l in listings:
+        l.cache_version = versions.get(l.pk)
+
+    if is_ajax:
+        from django.template.loader import render_to_string
+        html = render_to_string('partials/store_cards.html', {
+            'listings': listings,
+            'section': 'all',
+        }, request=request)
+        return JsonResponse({'html': html, 'next_cursor': next_cursor})
+
+    # The featured strip is only shown on the first page. The queryset is
+    # lazy, so it only runs when the cached strip has been invalidated.
+    show_featured = not cursor
+    featured = StoreCard.objects.filter(featured=True, in_stock=True).order_by('-created_at')[:8]
+
+    # Preserve the active filters on the "load more" link
+    from urllib.parse import urlencode
+    active = (
+        ('artist', artist_q), ('title', title_q), ('format', format_q),
+        ('condition', condition_q), ('decade', decade_q), ('country', country_q),
+    )
+    filter_params = {k: v for k, v in active if v}
+
+    # Facet counts are maintained incrementally (see accounts.facets); each
+    # option links to the current filters with that facet toggled.
+    from .facets import FACETS, facet_counts
+    counts = facet_counts()
+    facets = []
+    for facet, heading in FACETS:
+        options = []
+        for value, label, count in counts.get(facet, []):
+            selected = filter_params.get(facet, '').lower() == value.lower()
+            params = dict(filter_params)
+            if selected:
+                params.pop(facet, None)
+            else:
+                params[facet] = value
+            options.append({'label': label, 'count': count, 'selected': selected, 'query': urlencode(params)})
+        if options:
+            facets.append({'name': facet, 'heading': heading, 'options': options})
 
     context = {
+        'show_featured': show_featured,
         'featured': featured,
         'listings': listings,
+        'catalogue_version': catalogue_version,
+        'next_cursor': next_cursor,
+        'filter_query': urlencode(filter_params),
+        'facets': facets,
         'artist_q': artist_q,
         'title_q': title_q,
         'format_q': format_q,
+        'condition_q': condition_q,
+        'decade_q': decade_q,
+        'country_q': country_q,
     }
     return render(request, 'store_list.html', context)
 
@@ -1074,72 +1274,9 @@ def _get_session_basket(request):
     return request.session.setdefault('basket', {})
 
 
-def _get_basket_map(request):
-    """Return a mapping of listing_id -> quantity for the current request.
-
-    If the user is authenticated, return the persistent basket contents from DB.
-    Otherwise return the session-backed basket dict.
-    """
-    if request.user.is_authenticated:
-        try:
-            from .models import BasketItem
-            items = BasketItem.objects.filter(basket__user=request.user).values_list('listing_id', 'quantity')
-            return {str(lid): qty for lid, qty in items}
-        except Exception:
-            return {}
-    else:
-        # Clean session-backed basket by removing items that no longer exist
-        # or have been set to out-of-stock (stock == 0). Mutate the session
-        # in-place so subsequent requests see the cleaned basket.
-        sb = _get_session_basket(request)
-        if not sb:
-            return sb
-        from .models import Listing
-        changed = False
-        for lid in list(sb.keys()):
-            try:
-                listing = Listing.objects.get(pk=int(lid))
-                # If stock is defined and zero, remove from session basket
-                if listing.stock is not None and listing.stock == 0:
-                    del sb[lid]
-                    changed = True
-            except Exception:
-                # Remove stale ids
-                try:
-                    del sb[lid]
-                    changed = True
-                except Exception:
-                    pass
-        if changed:
-            try:
-                request.session.modified = True
-            except Exception:
-                pass
-        return sb
-
-
 def basket_view(request):
-    from .models import Listing
-    basket = _get_basket_map(request)
-    items = []
-    total = 0
-    for lid, qty in list(basket.items()):
-        try:
-            listing = Listing.objects.get(pk=int(lid))
-        except Exception:
-            # remove stale ids
-            try:
-                del request.session['basket'][lid]
-                request.session.modified = True
-            except Exception:
-                pass
-            continue
-        qty = int(qty)
-        price = listing.price or 0
-        line_total = price * qty
-        items.append({'listing': listing, 'quantity': qty, 'line_total': line_total})
-        total += line_total
-
+    from . import basket as basket_service
+    items, total = basket_service.lines(request)
     return render(request, 'basket.html', {'items': items, 'total': total})
 
 
@@ -1211,8 +1348,9 @@ def basket_add(request, listing_id: int):
     if is_ajax:
         # return the updated basket count so the frontend can update the badge
         try:
-            bm = _get_basket_map(request) or {}
-            total_count = sum(int(v) for v in bm.values())
+            from . import basket as basket_service
+            basket_service.forget(request)
+            total_count = basket_service.summary(request)['count']
         except Exception:
             total_count = 0
         return JsonResponse({'status': 'ok', 'message': 'Added to basket.', 'count': total_count})
@@ -1252,20 +1390,19 @@ def basket_checkout(request):
     """
     import stripe
 
-    basket = _get_basket_map(request)
+    from . import basket as basket_service
+    basket, listings = basket_service.load(request)
     if not basket:
         messages.error(request, 'Your basket is empty.', extra_tags='basket')
         return redirect('basket')
 
     # Build line items from listings
-    from .models import Listing
     stripe.api_key = getattr(settings, 'STRIPE_SECRET_KEY', '')
     currency = getattr(settings, 'STRIPE_CURRENCY', 'gbp')
     line_items = []
     for lid, qty in basket.items():
-        try:
-            listing = Listing.objects.get(pk=int(lid))
-        except Exception:
+        listing = listings.get(int(lid))
+        if listing is None:
             continue
         unit_amount = int((listing.price or 0) * 100)
         # Stripe requires positive amounts
@@ -0,0 +1,378 @@
+"""Two-tier cache backend: a small in-process LRU in front of a shared cache.
+
+Reads are served from a per-process LRU when possible and otherwise from
+the shared backend (Redis in production, otherwise `DatabaseCache` below),
+whose answer is then kept locally for at most LOCAL_TIMEOUT seconds. The LRU
+is bounded both by entry count and by the pickled size of its values, and
+evicts least recently used entries first.
+
+Writes go through to the shared backend and bump the generation of the
+key's namespace there (the part of the key before the first ':' or '.',
+e.g. ``discogs`` or ``catalogue``). Each process compares the shared
+generations with the ones its LRU was filled under at the start of every
+request (and at least every CHECK_INTERVAL seconds outside requests) and
+drops the local entries of any namespace that changed, so a write in one
+worker is seen by the others on their next request without flushing
+unrelated entries.
+
+Namespaces listed in IMMUTABLE hold keys that are written once and never
+change (e.g. Django's ``template`` fragment keys, which embed the versions
+they were rendered under), so setting or adding them doesn't bump the
+generation; deleting them still does.
+
+Keys starting with one of LOCAL_EXCLUDE (rate-limit counters, locks,
+circuit state and the like) bypass the LRU entirely: they are read and
+written on the shared backend every time and never bump the generation.
+
+Configure with::
+
+    CACHES = {
+        "shared": {...},
+        "default": {
+            "BACKEND": "config.cache.TwoTierCache",
+            "OPTIONS": {"SHARED": "shared", "LOCAL_TIMEOUT": 5, ...},
+        },
+    }
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.db import DatabaseCache as BaseDatabaseCache
+from django.core.signals import request_started
+from django.db import connections, router, transaction
+
+GENERATION_KEY = 'twotier:generation:{}'
+
+
+def _namespace(key):
+    """The invalidation namespace of `key`: its first ':' or '.' separated part."""
+    for i, char in enumerate(key):
+        if char in ':.':
+            return key[:i]
+    return key
+
+
+class _LocalStore:
+    """The LRU shared by every thread (and cache handle) of one process."""
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # key -> (pickled value, expires_at, namespace)
+        self.entries = OrderedDict()
+        self.size = 0
+        # namespace -> shared generation the local entries were read under
+        self.generations = {}
+        self.checked_at = 0.0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                self._pop(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, pickled, timeout, namespace):
+        if len(pickled) > self.max_bytes:
+            return
+        with self.lock:
+            self._pop(key)
+            self.entries[key] = (pickled, time.monotonic() + timeout, namespace)
+            self.size += len(pickled)
+            while self.entries and (len(self.entries) > self.max_entries or self.size > self.max_bytes):
+                self._pop(next(iter(self.entries)))
+
+    def discard(self, key):
+        with self.lock:
+            self._pop(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            self.generations.clear()
+
+    def clear_namespace(self, namespace):
+        with self.lock:
+            for key in [k for k, entry in self.entries.items() if entry[2] == namespace]:
+                self._pop(key)
+
+    def _pop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[0])
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _on_request_started(**kwargs):
+    # Revalidate every process-local tier against its generation key once per request
+    for store in list(_stores.values()):
+        store.checked_at = 0.0
+
+
+request_started.connect(_on_request_started, dispatch_uid='config.cache.request_started')
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED', 'shared')
+        self.local_timeout = float(options.get('LOCAL_TIMEOUT', 5))
+        self.check_interval = float(options.get('CHECK_INTERVAL', 1))
+        self.local_exclude = tuple(options.get('LOCAL_EXCLUDE', ()))
+        self.immutable = frozenset(options.get('IMMUTABLE', ()))
+        # Django makes one backend instance per thread; they share the LRU
+        # of their (LOCATION, SHARED) pair
+        store_key = (location, self._shared_alias)
+        with _stores_lock:
+            if store_key not in _stores:
+                _stores[store_key] = _LocalStore(
+                    int(options.get('LOCAL_MAX_ENTRIES', 1000)),
+                    int(options.get('LOCAL_MAX_BYTES', 16 * 1024 * 1024)),
+                )
+            self._store = _stores[store_key]
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    # -- local tier helpers -------------------------------------------------
+
+    def _local_key(self, key, version):
+        return f'{version if version is not None else self.version}:{key}'
+
+    def _cacheable(self, key):
+        return not key.startswith(self.local_exclude)
+
+    def _sync(self):
+        """Drop local namespaces another process has written to since they were filled."""
+        store = self._store
+        now = time.monotonic()
+        if now - store.checked_at < self.check_interval:
+            return
+        namespaces = list(store.generations)
+        if namespaces:
+            try:
+                found = self.shared.get_many([GENERATION_KEY.format(ns) for ns in namespaces])
+            except Exception:
+                # Can't tell what changed: don't serve anything local
+                store.clear()
+                found = None
+            if found is not None:
+                for ns in namespaces:
+                    generation = found.get(GENERATION_KEY.format(ns))
+                    if generation != store.generations.get(ns):
+                        store.clear_namespace(ns)
+                        store.generations[ns] = generation
+        store.checked_at = now
+
+    def _track(self, namespace):
+        """Make sure the generation local entries of `namespace` are read under is known.
+
+        Must run before the value itself is read from the shared tier, so a
+        write in between is caught by the next sync. Returns False when the
+        generation can't be read (nothing should be kept locally then).
+        """
+        store = self._store
+        if namespace in store.generations:
+            return True
+        try:
+            store.generations[namespace] = self.shared.get(GENERATION_KEY.format(namespace))
+        except Exception:
+            return False
+        return True
+
+    def _bump(self, namespace):
+        """Record a write so every other process drops its local entries of `namespace`."""
+        store = self._store
+        key = GENERATION_KEY.format(namespace)
+        try:
+            try:
+                generation = self.shared.incr(key)
+            except ValueError:
+                # Seeded from the clock so a cleared or evicted key can't
+                # come back at a value some process already holds
+                seed = int(time.time() * 1000)
+                generation = seed if self.shared.add(key, seed, None) else self.shared.incr(key)
+        except Exception:
+            store.clear_namespace(namespace)
+            store.generations.pop(namespace, None)
+            return
+        previous = store.generations.get(namespace)
+        if previous is None or generation != previous + 1:
+            # Someone else wrote in between; whatever we hold may be stale
+            store.clear_namespace(namespace)
+        store.generations[namespace] = generation
+
+    def _written(self, namespace):
+        """Record a set or add in `namespace`: bump it unless its keys never change."""
+        if namespace in self.immutable:
+            # Nothing anyone holds can be stale; just allow it to be kept locally
+            self._track(namespace)
+        else:
+            self._bump(namespace)
+
+    def _local_timeout(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            return self.local_timeout
+        return min(self.local_timeout, timeout)
+
+    def _remember(self, key, value, version, timeout=DEFAULT_TIMEOUT):
+        local_timeout = self._local_timeout(timeout)
+        if local_timeout <= 0:
+            return
+        namespace = _namespace(key)
+        if namespace not in self._store.generations:
+            return
+        try:
+            pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return
+        self._store.set(self._local_key(key, version), pickled, local_timeout, namespace)
+
+    # -- cache API ----------------------------------------------------------
+
+    def get(self, key, default=None, version=None):
+        if not self._cacheable(key):
+            return self.shared.get(key, default, version=version)
+        self._sync()
+        pickled = self._store.get(self._local_key(key, version))
+        if pickled is not None:
+            return pickle.loads(pickled)
+        self._track(_namespace(key))
+        sentinel = object()
+        value = self.shared.get(key, sentinel, version=version)
+        if value is sentinel:
+            return default
+        self._remember(key, value, version)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = {}
+        missing = []
+        for key in keys:
+            if not self._cacheable(key):
+                missing.append(key)
+                continue
+            self._sync()
+            pickled = self._store.get(self._local_key(key, version))
+            if pickled is None:
+                self._track(_namespace(key))
+                missing.append(key)
+            else:
+                found[key] = pickle.loads(pickled)
+        if missing:
+            fetched = self.shared.get_many(missing, version=version)
+            for key, value in fetched.items():
+                if self._cacheable(key):
+                    self._remember(key, value, version)
+            found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        if self._cacheable(key):
+            self._written(_namespace(key))
+            self._remember(key, value, version, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        for namespace in {_namespace(key) for key in data if self._cacheable(key)}:
+            self._written(namespace)
+        for key, value in data.items():
+            if self._cacheable(key) and key not in failed:
+                self._remember(key, value, version, timeout)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added and self._cacheable(key):
+            self._written(_namespace(key))
+            self._remember(key, value, version, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        touched = self.shared.touch(key, timeout, version=version)
+        if self._cacheable(key):
+            self._store.discard(self._local_key(key, version))
+        return touched
+
+    def delete(self, key, version=None):
+        deleted = self.shared.delete(key, version=version)
+        if self._cacheable(key):
+            self._store.discard(self._local_key(key, version))
+            self._bump(_namespace(key))
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.shared.delete_many(keys, version=version)
+        local = [key for key in keys if self._cacheable(key)]
+        for key in local:
+            self._store.discard(self._local_key(key, version))
+        for namespace in {_namespace(key) for key in local}:
+            self._bump(namespace)
+
+    def has_key(self, key, version=None):
+        if self._cacheable(key):
+            self._sync()
+            if self._store.get(self._local_key(key, version)) is not None:
+                return True
+        return self.shared.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        if self._cacheable(key):
+            self._bump(_namespace(key))
+            self._remember(key, value, version, None)
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version=version)
+
+    def clear(self):
+        # Takes the shared generation keys with it, so every process drops
+        # its entries once it sees them gone
+        self.shared.clear()
+        self._store.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+
+class DatabaseCache(BaseDatabaseCache):
+    """Django's database cache with an incr() that is atomic across processes.
+
+    The stock incr() is a get followed by a set, so concurrent increments
+    (rate-limit counters, generation keys) can be lost. Here the row is
+    locked for the duration where the database supports SELECT ... FOR
+    UPDATE; add() is already atomic, relying on the primary key.
+    """
+
+    def incr(self, key, delta=1, version=None):
+        db = router.db_for_write(self.cache_model_class)
+        connection = connections[db]
+        with transaction.atomic(using=db):
+            if connection.features.has_select_for_update:
+                table = connection.ops.quote_name(self._table)
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'SELECT cache_key FROM {table} WHERE cache_key = %s FOR UPDATE',
+                        [self.make_and_validate_key(key, version=version)],
+                    )
+            return super().incr(key, delta, version=version)
@@ -96,6 +96,41 @@ if DATABASE_URL:
         # If dj_database_url isn't installed the app will continue to use sqlite
         pass
 
+# Caches: a per-process LRU (config.cache.TwoTierCache) in front of a cache
+# shared by every worker and dyno. Set REDIS_URL in production; without it
+# the shared tier is a table in the database (create it with
+# `manage.py createcachetable`), whose add/incr stay atomic across workers.
+REDIS_URL = os.environ.get("REDIS_URL")
+if REDIS_URL:
+    SHARED_CACHE = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    }
+else:
+    SHARED_CACHE = {
+        "BACKEND": "config.cache.DatabaseCache",
+        "LOCATION": "django_cache",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    }
+CACHES = {
+    "shared": SHARED_CACHE,
+    "default": {
+        "BACKEND": "config.cache.TwoTierCache",
+        "OPTIONS": {
+            "SHARED": "shared",
+            "LOCAL_TIMEOUT": float(os.environ.get("CACHE_LOCAL_TIMEOUT", "5")),
+            "LOCAL_MAX_ENTRIES": int(os.environ.get("CACHE_LOCAL_MAX_ENTRIES", "1000")),
+            "LOCAL_MAX_BYTES": int(os.environ.get("CACHE_LOCAL_MAX_BYTES", str(16 * 1024 * 1024))),
+            # Counters, locks and breaker state must always be read fresh
+            "LOCAL_EXCLUDE": [
+                "ratelimit:", "metrics:", "circuit:", "lock:", "tokenpool:",
+            ],
+            # Fragment keys embed their versions, so writing one invalidates nothing
+            "IMMUTABLE": ["template"],
+        },
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = []
 
 LANGUAGE_CODE = "en-us"
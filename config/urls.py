@@ -46,6 +46,8 @@ urlpatterns = [
     path("messages/guest/<uuid:reference>/", guest_reply, name="guest_reply"),
     path("manage/", manage_landing, name="manage_landing"),
     path("manage/discogs/", discogs_search, name="manage_discogs"),
+    path("manage/discogs/metrics/", accounts_views.discogs_metrics_view, name="discogs_metrics"),
+    path("manage/discogs/enrich/", accounts_views.discogs_enrich_view, name="discogs_enrich"),
     path("manage/listings/", listing_list, name="listing_list"),
     path("manage/listings/<int:pk>/quick-update/", accounts_views.listing_quick_update, name="listing_quick_update"),
     path("manage/discogs/price_suggestions/<int:release_id>/", discogs_price_suggestions_view, name="discogs_price_suggestions"),
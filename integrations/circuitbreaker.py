@@ -0,0 +1,109 @@
+"""A circuit breaker shared by every worker through the Django cache.
+
+While an upstream API is down, each call would otherwise wait out its
+timeouts and retries before falling back to cached data. The breaker counts
+consecutive failures (network errors and 5xx answers); after `threshold` of
+them it opens, and calls are refused at once so callers serve what they
+have. Once `cooldown` seconds have passed it is half-open: a single trial
+call is let through (claimed with ``cache.add``, so one worker makes it).
+A success closes the breaker, a failure opens it for another cooldown.
+
+Like integrations.ratelimit, the state is only shared between workers and
+dynos when they share a cache backend.
+"""
+import time
+from typing import Any, Dict
+
+from django.core.cache import cache
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling upstream while the breaker is open."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"circuit open, next trial in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, threshold: int = 5, cooldown: float = 30.0, trial_timeout: float = 30.0):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        # A trial that never reports back (e.g. its worker died) stops
+        # blocking other trials after this long
+        self.trial_timeout = trial_timeout
+
+    def _key(self, part: str) -> str:
+        return f"circuit:{self.name}:{part}"
+
+    def allow(self) -> bool:
+        """Return if a call may go upstream now; raise CircuitOpen otherwise.
+
+        Returns True when the caller has claimed the half-open trial; if it
+        then doesn't call upstream after all, it must `release_trial`.
+        """
+        try:
+            opened_at = cache.get(self._key("opened_at"))
+            if opened_at is None:
+                return False
+            retry_after = opened_at + self.cooldown - time.time()
+            if retry_after <= 0 and cache.add(self._key("trial"), 1, int(self.trial_timeout)):
+                return True
+        except Exception:
+            # A cache outage shouldn't stop all API traffic
+            return False
+        raise CircuitOpen(max(retry_after, 0.0))
+
+    def release_trial(self) -> None:
+        """Give up a claimed trial without an outcome, so another caller can make it."""
+        try:
+            cache.delete(self._key("trial"))
+        except Exception:
+            pass
+
+    def record_success(self) -> None:
+        try:
+            if not cache.get_many([self._key("failures"), self._key("opened_at")]):
+                return
+            cache.delete_many([self._key("failures"), self._key("opened_at"), self._key("trial")])
+        except Exception:
+            pass
+
+    def record_failure(self) -> None:
+        try:
+            cache.add(self._key("failures"), 0, None)
+            failures = cache.incr(self._key("failures"))
+            opened_at = cache.get(self._key("opened_at"))
+            if opened_at is not None or failures >= self.threshold:
+                # Open, or re-open after a failed trial, for a full cooldown
+                cache.set(self._key("opened_at"), time.time(), None)
+                cache.delete(self._key("trial"))
+        except Exception:
+            pass
+
+    def reset(self) -> None:
+        """Close the breaker by hand."""
+        cache.delete_many([self._key("failures"), self._key("opened_at"), self._key("trial")])
+
+    def state(self) -> Dict[str, Any]:
+        """Return ``{'state', 'failures', 'opened_at', 'retry_in'}`` for display."""
+        try:
+            found = cache.get_many([self._key("failures"), self._key("opened_at")])
+        except Exception:
+            found = {}
+        failures = int(found.get(self._key("failures")) or 0)
+        opened_at = found.get(self._key("opened_at"))
+        if opened_at is None:
+            return {"state": CLOSED, "failures": failures, "opened_at": None, "retry_in": None}
+        retry_in = opened_at + self.cooldown - time.time()
+        return {
+            "state": OPEN if retry_in > 0 else HALF_OPEN,
+            "failures": failures,
+            "opened_at": opened_at,
+            "retry_in": max(int(retry_in), 0),
+        }
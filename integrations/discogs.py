@@ -1,22 +1,365 @@
-"""Small Discogs API helper with caching and retry/backoff.
+"""Small Discogs API helper with caching and deadline-bounded retries.
 
-Usage: set DISCOGS_TOKEN in env (recommended) or pass token param.
+Usage: set DISCOGS_TOKEN (or a comma-separated DISCOGS_TOKENS pool) in env
+(recommended) or pass token param.
 """
 from __future__ import annotations
 
+import json
 import os
+import random
+import threading
 import time
-from typing import Any, Dict, List, Optional
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import requests
+from requests.adapters import HTTPAdapter
 from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
 
-BASE_URL = "https://api.discogs.com"
+from integrations import metrics
+from integrations.circuitbreaker import CircuitBreaker, CircuitOpen
+from integrations.ratelimit import RateLimited
+from integrations.tokenpool import TokenPool
+
+BASE_URL = os.environ.get("DISCOGS_BASE_URL", "https://api.discogs.com")
 DEFAULT_USER_AGENT = "alans-albums/1.0 +https://example.com"
 
+# Separate connect/read timeouts: fail fast when api.discogs.com is
+# unreachable, but allow slower responses once connected.
+CONNECT_TIMEOUT = float(os.environ.get("DISCOGS_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.environ.get("DISCOGS_READ_TIMEOUT", "10"))
+# Keep-alive connections held per worker process
+POOL_MAXSIZE = int(os.environ.get("DISCOGS_POOL_MAXSIZE", "10"))
+
+# Discogs allows 60 authenticated requests per minute per token. Each
+# token's quota is shared by all workers through the cache; callers wait at
+# most RATE_LIMIT_WAIT seconds for a call and otherwise serve what is cached.
+# With several tokens each call goes to the one with the most headroom.
+RATE_LIMIT = int(os.environ.get("DISCOGS_RATE_LIMIT", "60"))
+RATE_LIMIT_WAIT = float(os.environ.get("DISCOGS_RATE_LIMIT_WAIT", "2"))
+TOKENS = os.environ.get("DISCOGS_TOKENS", "").split(",")
+if not any(t.strip() for t in TOKENS):
+    TOKENS = [os.environ.get("DISCOGS_TOKEN", "")]
+# How long a token answering 401 is left out of the pool
+TOKEN_EJECT_SECONDS = float(os.environ.get("DISCOGS_TOKEN_EJECT_SECONDS", "600"))
+token_pool = TokenPool(TOKENS, RATE_LIMIT, 60.0, TOKEN_EJECT_SECONDS)
+
+# After CIRCUIT_THRESHOLD consecutive network errors/5xx every worker stops
+# calling Discogs and serves cached or local data; one trial call is let
+# through every CIRCUIT_COOLDOWN seconds until Discogs answers again.
+CIRCUIT_THRESHOLD = int(os.environ.get("DISCOGS_CIRCUIT_THRESHOLD", "5"))
+CIRCUIT_COOLDOWN = float(os.environ.get("DISCOGS_CIRCUIT_COOLDOWN", "30"))
+circuit = CircuitBreaker("discogs", CIRCUIT_THRESHOLD, CIRCUIT_COOLDOWN)
+
+# Total time one call may spend on Discogs including retries, kept well
+# under gunicorn's 30 s --timeout. Background refreshes get a longer budget.
+CALL_BUDGET = float(os.environ.get("DISCOGS_CALL_BUDGET", "8"))
+BACKGROUND_BUDGET = float(os.environ.get("DISCOGS_BACKGROUND_BUDGET", "60"))
+MAX_ATTEMPTS = 4
+
+# Concurrent misses for one key are coalesced into a single fetch; the
+# others poll the cache this often while they wait for its payload.
+COALESCE_POLL = 0.1
+LOCK_SLACK = 5
+
+
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Return this process's shared `requests.Session` for Discogs.
+
+    Reusing one session keeps TCP+TLS connections to api.discogs.com alive
+    between calls instead of handshaking on every cache miss. A new session
+    is created after a fork so workers never share sockets.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is not None and _session_pid == pid:
+        return _session
+    with _session_lock:
+        if _session is None or _session_pid != pid:
+            session = requests.Session()
+            session.headers.update({
+                "User-Agent": DEFAULT_USER_AGENT,
+                "Accept": "application/vnd.discogs.v2.discogs+json",
+                "Accept-Encoding": "gzip, deflate",
+            })
+            # Retries are handled by the callers; the adapter only pools
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+            _session_pid = pid
+    return _session
+
+
+def _get(
+    url: str,
+    token: Optional[str] = None,
+    params: Optional[Dict[str, Any]] = None,
+    block: float = RATE_LIMIT_WAIT,
+    timeout: Tuple[float, float] = (CONNECT_TIMEOUT, READ_TIMEOUT),
+    headers: Optional[Dict[str, str]] = None,
+) -> requests.Response:
+    """GET `url` on the shared session with `token`, else a pooled one.
+
+    Takes a call from the token's shared rate limit first, waiting up to
+    `block` seconds; raises RateLimited when none is available in time, and
+    CircuitOpen without calling out while Discogs is considered down.
+    """
+    endpoint = _endpoint(url)
+    try:
+        trial = circuit.allow()
+    except CircuitOpen:
+        metrics.incr("circuit.rejected")
+        raise
+    started = time.monotonic()
+    try:
+        token = token_pool.acquire(token, block)
+    except RateLimited:
+        metrics.incr("ratelimit.refused")
+        if trial:
+            # No call, so no outcome for the breaker: let another caller try
+            circuit.release_trial()
+        raise
+    finally:
+        metrics.incr("ratelimit.wait_ms", int((time.monotonic() - started) * 1000))
+    headers = dict(headers or {})
+    if token:
+        headers["Authorization"] = f"Discogs token={token}"
+    started = time.monotonic()
+    try:
+        resp = get_session().get(url, params=params, headers=headers, timeout=timeout)
+    except requests.RequestException:
+        metrics.incr(f"{endpoint}.upstream_error")
+        circuit.record_failure()
+        raise
+    finally:
+        metrics.observe(f"{endpoint}.latency", time.monotonic() - started)
+    metrics.incr(f"{endpoint}.status_{resp.status_code // 100}xx")
+    if resp.status_code >= 500:
+        circuit.record_failure()
+    elif resp.status_code != 429:
+        circuit.record_success()
+    remaining = resp.headers.get("X-Discogs-Ratelimit-Remaining")
+    if remaining is not None:
+        metrics.set_gauge("ratelimit.remaining", remaining)
+    if resp.status_code in (401, 429):
+        metrics.incr(f"http.{resp.status_code}")
+    # Takes the token out of rotation, for every worker, on 401/429
+    token_pool.report(token, resp.status_code, remaining, resp.headers.get("Retry-After"))
+    return resp
+
+
+def _endpoint(url_or_key: str) -> str:
+    """Return the metrics endpoint name for an API URL or a cache key."""
+    if "/database/search" in url_or_key or url_or_key.startswith("discogs:search:"):
+        return "search"
+    if "price_suggestions" in url_or_key:
+        return "price_suggestions"
+    return "release"
+
+
+# Metric names read back by metrics_snapshot()
+ENDPOINTS = ("search", "release", "price_suggestions")
+ENDPOINT_COUNTERS = (
+    "hit", "stale", "miss", "fallback", "not_found", "upstream_error",
+    "status_2xx", "status_3xx", "status_4xx", "status_5xx",
+)
+GLOBAL_COUNTERS = (
+    "http.401", "http.429", "http.retry", "backoff_ms",
+    "ratelimit.wait_ms", "ratelimit.refused", "search.prefetch", "search.prefetch_skipped",
+    "circuit.rejected",
+)
+
+
+def metrics_snapshot() -> Dict[str, Any]:
+    """Return the Discogs client metrics aggregated across workers."""
+    names = [f"{ep}.{c}" for ep in ENDPOINTS for c in ENDPOINT_COUNTERS]
+    values = metrics.counters(names + list(GLOBAL_COUNTERS))
+    endpoints = {}
+    for ep in ENDPOINTS:
+        counts = {c: values[f"{ep}.{c}"] for c in ENDPOINT_COUNTERS}
+        served = counts["hit"] + counts["stale"] + counts["miss"]
+        counts["hit_ratio"] = (counts["hit"] + counts["stale"]) / served if served else None
+        counts["latency"] = metrics.histogram(f"{ep}.latency")
+        endpoints[ep] = counts
+    remaining, remaining_at = metrics.gauge("ratelimit.remaining")
+    return {
+        "endpoints": endpoints,
+        # e.g. "http_429", "backoff_ms", "ratelimit_wait_ms"
+        "totals": {name.replace(".", "_"): values[name] for name in GLOBAL_COUNTERS},
+        "ratelimit_remaining": remaining,
+        # Seconds since a response last reported the remaining quota
+        "ratelimit_remaining_age": int(time.time() - remaining_at) if remaining_at else None,
+        # [(token fingerprint, calls left this minute)]; 0 while ejected
+        "tokens": token_pool.status(),
+        "circuit": circuit.state(),
+    }
+
+
+def reset_metrics() -> None:
+    metrics.reset(
+        [f"{ep}.{c}" for ep in ENDPOINTS for c in ENDPOINT_COUNTERS] + list(GLOBAL_COUNTERS),
+        [f"{ep}.latency" for ep in ENDPOINTS],
+        ["ratelimit.remaining"],
+    )
+
+
+# Payloads are cached inside a small envelope recording when they were
+# fetched, so views can derive ETag/Last-Modified without calling the API.
+# The `ttl` callers pass is the soft expiry: after it the payload is still
+# served but refreshed in the background, until the hard expiry
+# (ttl * STALE_FACTOR) drops it from the cache. A last-known-good copy is
+# kept much longer under "lkg:<key>" for when the API is failing.
+_ENVELOPE_MARKER = "__discogs__"
+STALE_FACTOR = int(os.environ.get("DISCOGS_STALE_FACTOR", "4"))
+LKG_TTL = int(os.environ.get("DISCOGS_LKG_TTL", str(60 * 60 * 24 * 30)))
+
+
+# A non-retryable 4xx (e.g. 404 for a release id that doesn't exist) is
+# cached as a negative entry for NEGATIVE_TTL seconds, so repeated views of
+# a bad id don't call out again. It is never kept as last-known-good.
+NEGATIVE_TTL = int(os.environ.get("DISCOGS_NEGATIVE_TTL", "3600"))
+
+# The next page of a search is only prefetched while more than this share
+# of the pool's quota is left, no token is blocked and the circuit is closed,
+# so speculative calls never compete with lookups someone is waiting for.
+PREFETCH_HEADROOM = float(os.environ.get("DISCOGS_PREFETCH_HEADROOM", "0.5"))
+
+
+class _NotFound:
+    def __repr__(self) -> str:
+        return "NOT_FOUND"
+
+
+# Returned in place of a payload for a negative entry
+NOT_FOUND = _NotFound()
+
+
+def _lkg_key(key: str) -> str:
+    return f"lkg:{key}"
+
+
+def _unwrap(value: Any) -> Tuple[Any, Optional[float], bool]:
+    """Return ``(payload, fetched_at, fresh)`` for a raw cached value."""
+    if value is None:
+        return None, None, False
+    if isinstance(value, dict) and value.get(_ENVELOPE_MARKER):
+        if value.get("missing"):
+            return NOT_FOUND, value.get("fetched_at"), True
+        soft_expires = value.get("soft_expires")
+        fresh = soft_expires is None or soft_expires > time.time()
+        data = value.get("data")
+        if value.get("z"):
+            data = json.loads(zlib.decompress(data).decode("utf-8"))
+        return data, value.get("fetched_at"), fresh
+    # Entries cached before the envelope was introduced
+    return value, None, True
+
+
+def _cache_get(key: str) -> Tuple[Any, Optional[float], bool]:
+    """Return ``(payload, fetched_at, fresh)`` for `key`.
+
+    ``(None, None, False)`` on a miss; `fresh` is False once the payload is
+    past its soft expiry.
+    """
+    try:
+        return _unwrap(cache.get(key))
+    except Exception:
+        return None, None, False
+
+
+def _cache_set(key: str, data: Any, ttl: int, compress: bool = False) -> None:
+    """Cache `data` in an envelope; `compress` stores it as zlib'd compact JSON."""
+    now = time.time()
+    envelope = {_ENVELOPE_MARKER: 1, "data": data, "fetched_at": now, "soft_expires": now + ttl}
+    if compress:
+        envelope["data"] = zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+        envelope["z"] = 1
+    try:
+        cache.set(key, envelope, ttl * STALE_FACTOR)
+        cache.set(_lkg_key(key), envelope, LKG_TTL)
+    except Exception:
+        # cache failures shouldn't break the app
+        pass
+
+
+def _not_found(key: str, resp: requests.Response) -> Any:
+    """Cache a negative entry for a non-retryable 4xx answer and return NOT_FOUND.
+
+    Returns None for answers that say nothing about the resource itself
+    (401: a token problem), which are left to be retried later.
+    """
+    if not 400 <= resp.status_code < 500 or resp.status_code in (401, 429):
+        return None
+    metrics.incr(f"{_endpoint(key)}.not_found")
+    envelope = {_ENVELOPE_MARKER: 1, "missing": resp.status_code, "fetched_at": time.time()}
+    try:
+        cache.set(key, envelope, NEGATIVE_TTL)
+    except Exception:
+        pass
+    return NOT_FOUND
+
+
+def _last_known_good(key: str) -> Any:
+    try:
+        return _unwrap(cache.get(_lkg_key(key)))[0]
+    except Exception:
+        return None
+
 
-def _get_token(token: Optional[str] = None) -> Optional[str]:
-    return token or os.environ.get("DISCOGS_TOKEN")
+# Release fields read by create_listing and discogs_release_details_view;
+# everything else (tracklist, videos, credits, community data...) is dropped
+# before caching unless the full payload is asked for.
+RELEASE_FIELDS = ("id", "title", "year", "country", "released", "notes")
+RELEASE_FORMAT_FIELDS = ("name", "qty", "text", "descriptions")
+RELEASE_IMAGE_FIELDS = ("uri", "uri150", "resource_url")
+
+
+def project_release(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the compact projection of a full release payload."""
+    out = {k: data[k] for k in RELEASE_FIELDS if data.get(k) not in (None, "")}
+    out["artists"] = [{"name": a["name"]} for a in data.get("artists") or [] if a.get("name")]
+    out["labels"] = [
+        {"name": lbl.get("name", ""), "catno": lbl.get("catno", "")} for lbl in data.get("labels") or []
+    ]
+    out["formats"] = [
+        {k: f[k] for k in RELEASE_FORMAT_FIELDS if f.get(k)} for f in data.get("formats") or []
+    ]
+    images = data.get("images") or []
+    if images and images[0]:
+        out["images"] = [{k: images[0][k] for k in RELEASE_IMAGE_FIELDS if images[0].get(k)}]
+    return out
+
+
+def release_cache_key(release_id: int, full: bool = False) -> str:
+    if full:
+        return f"discogs:release:{release_id}:full"
+    return f"discogs:release:{release_id}"
+
+
+def price_suggestions_cache_key(release_id: int) -> str:
+    return f"discogs:price_suggestions:{release_id}"
+
+
+def cached_fetched_at(key: str) -> Optional[float]:
+    """Return when the payload cached under `key` was fetched (epoch seconds).
+
+    None when nothing is cached. Used for conditional GET on the staff JSON
+    endpoints, so it never touches the network.
+    """
+    data, fetched_at, _ = _cache_get(key)
+    if data is None or data is NOT_FOUND:
+        return None
+    return fetched_at or 0.0
 
 
 def _cache_key_search(q: str, type_: str, page: int, per_page: int, year: Optional[str] = None, format_: Optional[str] = None, country: Optional[str] = None) -> str:
@@ -31,6 +374,205 @@ def _cache_key_search(q: str, type_: str, page: int, per_page: int, year: Option
     return "discogs:search:" + ":".join(parts)
 
 
+def _fetch(
+    url: str,
+    token: Optional[str] = None,
+    params: Optional[Dict[str, Any]] = None,
+    budget: float = CALL_BUDGET,
+    headers: Optional[Dict[str, str]] = None,
+) -> Optional[requests.Response]:
+    """GET `url`, retrying 429/5xx/network errors within `budget` seconds.
+
+    Returns the first response that shouldn't be retried (a 200, 304 or
+    another 4xx; a 401 is retried on another token when pooled), or None
+    once the budget is spent. Waits for rate-limit tokens,
+    backoff sleeps and read timeouts are all capped by what is left of the
+    budget, so a call never runs past it by more than the connect timeout.
+    """
+    deadline = time.monotonic() + budget
+    backoff = 0.5
+    for _ in range(MAX_ATTEMPTS):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            resp = _get(
+                url, token=token, params=params,
+                block=min(RATE_LIMIT_WAIT, remaining),
+                timeout=(CONNECT_TIMEOUT, max(0.5, min(READ_TIMEOUT, remaining))),
+                headers=headers,
+            )
+        except (RateLimited, CircuitOpen):
+            # No token before the budget runs out (a 429 blocks the limiter
+            # until its Retry-After), or Discogs is down
+            break
+        except requests.RequestException:
+            resp = None
+        # A pooled token that got 401 has been ejected; another may work
+        pooled_401 = resp is not None and resp.status_code == 401 and not token and len(token_pool.tokens) > 1
+        if resp is not None and resp.status_code != 429 and resp.status_code < 500 and not pooled_401:
+            return resp
+        metrics.incr("http.retry")
+        if resp is not None and resp.status_code in (401, 429):
+            # _get has blocked the token's limiter; the next attempt waits
+            # for it or goes to another token in the pool
+            continue
+        delay = backoff * random.uniform(0.5, 1.0)
+        if delay >= deadline - time.monotonic():
+            break
+        time.sleep(delay)
+        metrics.incr("backoff_ms", int(delay * 1000))
+        backoff *= 2
+    return None
+
+
+_refresh_executor: Optional[ThreadPoolExecutor] = None
+_refresh_pid: Optional[int] = None
+_refreshing: set = set()
+_refresh_lock = threading.Lock()
+
+
+def _refresh_in_background(key: str, func, *args, **kwargs) -> None:
+    """Run `func(*args, **kwargs)` on a worker thread, once per `key` at a time.
+
+    Used when a request's budget runs out: the response is served from what
+    is cached and the fetch finishes off the request path.
+    """
+    global _refresh_executor, _refresh_pid
+    with _refresh_lock:
+        if key in _refreshing:
+            return
+        if _refresh_executor is None or _refresh_pid != os.getpid():
+            _refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="discogs-refresh")
+            _refresh_pid = os.getpid()
+            _refreshing.clear()
+        _refreshing.add(key)
+
+    def run():
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            pass
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(key)
+            # The thread may have used a DB connection (e.g. database cache)
+            connection.close()
+
+    _refresh_executor.submit(run)
+
+
+def _lock_key(key: str) -> str:
+    return f"lock:{key}"
+
+
+def _fetch_once(key: str, fetch, args: tuple, budget: float, block: bool) -> Any:
+    """Run `fetch` for `key` unless another worker/thread already is.
+
+    The fetch is guarded by a cache lock taken with ``cache.add`` so that
+    concurrent misses for the same key cost one API call. When the lock is
+    held elsewhere and `block` is set, the cache is polled for the other
+    fetch's payload until it lands, the lock is released or `budget` runs
+    out; otherwise None is returned straight away.
+    """
+    lock = _lock_key(key)
+    try:
+        acquired = cache.add(lock, os.getpid(), int(budget) + LOCK_SLACK)
+    except Exception:
+        acquired = True
+    if acquired:
+        try:
+            return fetch(key, *args, budget)
+        finally:
+            try:
+                cache.delete(lock)
+            except Exception:
+                pass
+    if not block:
+        return None
+    deadline = time.monotonic() + budget
+    while time.monotonic() < deadline:
+        time.sleep(COALESCE_POLL)
+        try:
+            found = cache.get_many([key, lock])
+        except Exception:
+            return None
+        if key in found:
+            return _unwrap(found[key])[0]
+        if lock not in found:
+            # The other fetch gave up without caching anything
+            return None
+    return None
+
+
+def _lookup(key: str, fetch, *args, default: Any = None) -> Any:
+    """Serve `key` with stale-while-revalidate semantics.
+
+    `fetch(key, *args, budget)` calls the API, caches the payload and returns
+    it, returns NOT_FOUND when Discogs refused the request for good (see
+    `_not_found`), or None when the budget ran out. A fresh cached payload is
+    returned as is; a stale one is returned immediately while `fetch` runs in
+    the background. On a miss `fetch` runs inline (or the caller waits for a
+    concurrent fetch of the same key, see `_fetch_once`), and if the budget
+    runs out the last-known-good copy (else `default`) is returned while a
+    background fetch carries on. A negative entry, cached or just fetched,
+    gives `default` with no further calls.
+    """
+    endpoint = _endpoint(key)
+    cached, _, fresh = _cache_get(key)
+    if cached is NOT_FOUND:
+        metrics.incr(f"{endpoint}.hit")
+        return default
+    if cached is not None:
+        metrics.incr(f"{endpoint}.hit" if fresh else f"{endpoint}.stale")
+        if not fresh:
+            _refresh_in_background(key, _fetch_once, key, fetch, args, BACKGROUND_BUDGET, False)
+        return cached
+    metrics.incr(f"{endpoint}.miss")
+    data = _fetch_once(key, fetch, args, CALL_BUDGET, True)
+    if data is NOT_FOUND:
+        return default
+    if data is not None:
+        return data
+    metrics.incr(f"{endpoint}.fallback")
+    _refresh_in_background(key, _fetch_once, key, fetch, args, BACKGROUND_BUDGET, False)
+    fallback = _last_known_good(key)
+    return fallback if fallback is not None else default
+
+
+def _fetch_search(key: str, params: Dict[str, Any], token: Optional[str], ttl: int, budget: float):
+    resp = _fetch(f"{BASE_URL}/database/search", token=token, params=params, budget=budget)
+    if resp is None:
+        return None
+    if resp.status_code != 200:
+        return _not_found(key, resp)
+    data = resp.json()
+    payload = {"results": data.get("results", []), "pagination": data.get("pagination") or {}}
+    _cache_set(key, payload, ttl)
+    return payload
+
+
+def _search_payload(found: Any) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Split a cached search payload into ``(results, pagination)``.
+
+    Entries cached before pagination was stored are bare result lists.
+    """
+    if isinstance(found, list):
+        return found, {}
+    return found.get("results", []), found.get("pagination") or {}
+
+
+def _prefetch_search_page(key: str, params: Dict[str, Any], token: Optional[str], ttl: int) -> None:
+    """Fetch another page of a search in the background unless it is cached fresh or quota is short."""
+    if _cache_get(key)[2]:
+        return
+    if circuit.state()["state"] != "closed" or not token_pool.has_spare(PREFETCH_HEADROOM):
+        metrics.incr("search.prefetch_skipped")
+        return
+    metrics.incr("search.prefetch")
+    _refresh_in_background(key, _fetch_once, key, _fetch_search, (params, token, ttl), CALL_BUDGET, False)
+
+
 def search(
     q: str,
     type_: str = "release",
@@ -42,27 +584,25 @@ def search(
     format_: Optional[str] = None,
     country: Optional[str] = None,
     return_pagination: bool = False,
-) -> List[Dict[str, Any]]:
+) -> Union[List[Dict[str, Any]], Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
     """Search Discogs database and return list of result dicts.
 
-    This function will cache successful responses for `ttl` seconds and will
-    attempt a small retry/backoff on 429/5xx responses. On repeated failure it
-    will return an empty list (or cached value if present).
+    With `return_pagination` a ``(results, pagination)`` tuple is returned
+    instead, whether the page came from the API, the cache or the local
+    release table.
+
+    Successful responses are cached for `ttl` seconds and served stale
+    (while refreshed in the background) for a while after that. 429/5xx
+    responses are retried within DISCOGS_CALL_BUDGET seconds; when the
+    budget runs out the last known good results are returned straight away
+    (else matches from the local release table, see `local_search`) and the
+    fetch finishes in the background. The next page, when there is one, is
+    prefetched in the background so paging through results hits the cache.
     """
     if not q:
-        return []
+        return ([], {}) if return_pagination else []
 
     key = _cache_key_search(q, type_, page, per_page, year=year, format_=format_, country=country)
-    cached = cache.get(key)
-    if cached is not None:
-        return cached
-
-    token = _get_token(token)
-    headers = {"User-Agent": DEFAULT_USER_AGENT}
-    if token:
-        headers["Authorization"] = f"Discogs token={token}"
-
-    url = f"{BASE_URL}/database/search"
     params = {"q": q, "type": type_, "page": page, "per_page": per_page}
     # Optional filters supported by the Discogs API
     if year:
@@ -74,94 +614,163 @@ def search(
         # Discogs supports country filtering on search
         params["country"] = country
 
-    attempts = 0
-    backoff = 1.0
-    max_attempts = 4
-    while attempts < max_attempts:
-        attempts += 1
-        try:
-            resp = requests.get(
-                url, headers=headers, params=params, timeout=10
-            )
-        except requests.RequestException:
-            # network-level error — backoff and retry
-            if attempts >= max_attempts:
-                break
-            time.sleep(backoff)
-            backoff *= 2
-            continue
+    found = _lookup(key, _fetch_search, params, token, ttl)
+    if found is None:
+        # API unavailable and nothing cached: search the imported releases
+        results, pagination = local_search(
+            q, page=page, per_page=per_page, year=year, format_=format_, country=country
+        )
+    else:
+        results, pagination = _search_payload(found)
+        pages = pagination.get("pages")
+        if (page < pages) if pages else len(results) >= per_page:
+            next_key = _cache_key_search(q, type_, page + 1, per_page, year=year, format_=format_, country=country)
+            _prefetch_search_page(next_key, dict(params, page=page + 1), token, ttl)
+    if return_pagination:
+        return results, pagination
+    return results
+
+
+def _release_model():
+    from django.apps import apps
+    return apps.get_model("accounts", "DiscogsRelease")
+
+
+def _stored_release(release_id: int):
+    try:
+        return _release_model().objects.filter(pk=release_id).first()
+    except Exception:
+        # e.g. table not migrated yet
+        return None
 
-        if resp.status_code == 200:
-            data = resp.json()
-            results = data.get("results", [])
-            pagination = data.get('pagination') or {}
-            # cache only the results list for backward compatibility
-            try:
-                cache.set(key, results, ttl)
-            except Exception:
-                # cache failures shouldn't break the app
-                pass
-            if return_pagination:
-                return results, pagination
-            return results
-
-        if resp.status_code == 429:
-            # Rate limited — respect Retry-After if provided
-            retry_after = resp.headers.get("Retry-After")
-            if retry_after and retry_after.isdigit():
-                wait = float(retry_after)
-            else:
-                wait = backoff
-            time.sleep(wait)
-            backoff *= 2
-            continue
 
-        if 500 <= resp.status_code < 600:
-            # server error, backoff and retry
-            if attempts >= max_attempts:
-                break
-            time.sleep(backoff)
-            backoff *= 2
-            continue
+def local_search(
+    q: str,
+    page: int = 1,
+    per_page: int = 12,
+    year: Optional[str] = None,
+    format_: Optional[str] = None,
+    country: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Search the local DiscogsRelease table without calling the API.
 
-        # For other 4xx errors, don't retry (bad request, unauthorized, etc.)
-        break
+    It holds releases loaded by `manage.py import_discogs_dump` plus any
+    fetched through `get_release`. Returns ``(results, pagination)`` shaped
+    like the API's search response.
+    """
+    try:
+        from accounts.search import release_matching_ids
+
+        qs = _release_model().objects.filter(pk__in=release_matching_ids(q))
+        if year:
+            qs = qs.filter(year=int(year))
+        if format_:
+            qs = qs.filter(formats__icontains=format_)
+        if country:
+            qs = qs.filter(country__iexact=country)
+        total = qs.count()
+        start = (max(page, 1) - 1) * per_page
+        rows = qs.order_by("artist", "title", "release_id").defer("payload")[start:start + per_page]
+    except Exception:
+        return [], {}
+    results = [
+        {
+            "id": r.release_id,
+            "type": "release",
+            "title": f"{r.artist} - {r.title}" if r.artist else r.title,
+            "year": str(r.year or ""),
+            "country": r.country,
+            "format": [f.strip() for f in r.formats.split(",") if f.strip()],
+            "catno": r.catno,
+            "thumb": "",
+            "resource_url": f"{BASE_URL}/releases/{r.release_id}",
+        }
+        for r in rows
+    ]
+    pagination = {"page": page, "pages": max(1, -(-total // per_page)), "per_page": per_page, "items": total}
+    return results, pagination
+
+
+def _fetch_release(key: str, release_id: int, token: Optional[str], ttl: int, full: bool, budget: float):
+    """Load a release into the cache from the database tier or the API.
+
+    A stored copy younger than `ttl` is used as is. An older one is
+    revalidated with If-None-Match, so an unchanged release costs a 304
+    rather than a full payload. The database keeps the full payload; the
+    cache gets its compressed projection unless `full` is set.
+    """
+    stored = _stored_release(release_id)
+    now = time.time()
+    if stored is not None and stored.fetched_at.timestamp() + ttl > now:
+        data = stored.data if full else project_release(stored.data)
+        _cache_set(key, data, int(stored.fetched_at.timestamp() + ttl - now) or 1, compress=True)
+        return data
 
-    # If we reach here, try returning whatever is in cache else empty list
-    return cached or []
+    headers = {"If-None-Match": stored.etag} if stored is not None and stored.etag else None
+    resp = _fetch(f"{BASE_URL}/releases/{release_id}", token=token, budget=budget, headers=headers)
+    if resp is None:
+        return None
+    if resp.status_code == 304 and stored is not None:
+        data = stored.data
+        stored.fetched_at = timezone.now()
+        _save_release(stored, ["fetched_at"])
+    elif resp.status_code == 200:
+        data = resp.json()
+        release = _release_model().from_payload(
+            release_id, data, etag=resp.headers.get("ETag", ""), fetched_at=timezone.now()
+        )
+        _save_release(release)
+    else:
+        return _not_found(key, resp)
+    if not full:
+        data = project_release(data)
+    _cache_set(key, data, ttl, compress=True)
+    return data
+
+
+def _save_release(release, update_fields=None) -> None:
+    try:
+        release.save(update_fields=update_fields)
+    except Exception:
+        # The cache tier still works without the table
+        pass
 
 
 def get_release(
-    release_id: int, token: Optional[str] = None, ttl: int = 86400
+    release_id: int, token: Optional[str] = None, ttl: int = 86400, full: bool = False
 ) -> Optional[Dict[str, Any]]:
-    """Retrieve a release by id and cache the response."""
+    """Retrieve a release by id (see `_lookup` and `_fetch_release`).
+
+    Returns the compact projection from `project_release` unless `full` is
+    set. Releases are cached in the Django cache and persisted in the
+    DiscogsRelease table, which also serves as the fallback of last resort
+    when the API is unavailable.
+    """
     if not release_id:
         return None
-    key = f"discogs:release:{release_id}"
-    cached = cache.get(key)
-    if cached is not None:
-        return cached
-
-    token = _get_token(token)
-    headers = {"User-Agent": DEFAULT_USER_AGENT}
-    if token:
-        headers["Authorization"] = f"Discogs token={token}"
-
-    url = f"{BASE_URL}/releases/{release_id}"
+    data = _lookup(
+        release_cache_key(release_id, full), _fetch_release, release_id, token, ttl, full
+    )
+    if data is None:
+        stored = _stored_release(release_id)
+        if stored is not None:
+            data = stored.data if full else project_release(stored.data)
+    return data
+
+
+def _fetch_price_suggestions(key: str, release_id: int, token: Optional[str], ttl: int, budget: float):
+    resp = _fetch(f"{BASE_URL}/marketplace/price_suggestions/{release_id}", token=token, budget=budget)
+    if resp is None:
+        return None
+    if resp.status_code != 200:
+        # e.g. 404 when Discogs has no suggestions: nothing to retry later
+        return _not_found(key, resp)
     try:
-        resp = requests.get(url, headers=headers, timeout=10)
-    except requests.RequestException:
-        return cached
-
-    if resp.status_code == 200:
-        data = resp.json()
-        try:
-            cache.set(key, data, ttl)
-        except Exception:
-            pass
-        return data
-
-    return cached
+        data = resp.json() or {}
+    except Exception:
+        data = {}
+    _cache_set(key, data, ttl)
+    return data
 
 
 def price_suggestions(
@@ -178,31 +787,94 @@ def price_suggestions(
     except Exception:
         return {}
 
-    key = f"discogs:price_suggestions:{release_id}"
-    cached = cache.get(key)
-    if cached is not None:
-        return cached
+    return _lookup(
+        price_suggestions_cache_key(release_id), _fetch_price_suggestions, release_id, token, ttl,
+        default={},
+    )
 
-    token = _get_token(token)
-    headers = {"User-Agent": DEFAULT_USER_AGENT}
-    if token:
-        headers["Authorization"] = f"Discogs token={token}"
 
-    url = f"{BASE_URL}/marketplace/price_suggestions/{release_id}"
-    try:
-        resp = requests.get(url, headers=headers, timeout=10)
-    except requests.RequestException:
-        return cached or {}
+# Batch enrichment of search hits: release details and price suggestions are
+# looked up concurrently on a small per-process pool. Every lookup still goes
+# through the cache, single-flight lock and shared rate limiter above.
+ENRICH_WORKERS = int(os.environ.get("DISCOGS_ENRICH_WORKERS", "4"))
+ENRICH_BUDGET = float(os.environ.get("DISCOGS_ENRICH_BUDGET", "10"))
+
+_enrich_executor: Optional[ThreadPoolExecutor] = None
+_enrich_pid: Optional[int] = None
+_enrich_lock = threading.Lock()
 
-    if resp.status_code == 200:
+
+def _enrich_one(release_id: int) -> Dict[str, Any]:
+    try:
+        release = get_release(release_id)
+        return {
+            "release": release,
+            "price_suggestions": price_suggestions(release_id),
+            "not_found": release is None and _cache_get(release_cache_key(release_id))[0] is NOT_FOUND,
+        }
+    finally:
+        connection.close()
+
+
+def _cached_enrichment(release_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    keys = {}
+    for rid in release_ids:
+        keys[release_cache_key(rid)] = (rid, "release")
+        keys[price_suggestions_cache_key(rid)] = (rid, "price_suggestions")
+    try:
+        found = cache.get_many(list(keys))
+    except Exception:
+        found = {}
+    out: Dict[int, Dict[str, Any]] = {}
+    for key, value in found.items():
+        rid, field = keys[key]
+        entry = out.setdefault(rid, {"release": None, "price_suggestions": None, "not_found": False})
+        data = _unwrap(value)[0]
+        if data is NOT_FOUND:
+            # Known to be missing upstream: nothing more to fetch
+            if field == "release":
+                entry["not_found"] = True
+            else:
+                entry[field] = {}
+        else:
+            entry[field] = data
+    return out
+
+
+def enrich_releases(
+    release_ids, budget: float = ENRICH_BUDGET, cached_only: bool = False
+) -> Dict[int, Dict[str, Any]]:
+    """Return ``{release_id: {"release": ..., "price_suggestions": ...}}``.
+
+    Lookups run concurrently on at most ENRICH_WORKERS threads. Ids not done
+    within `budget` seconds are left out of the result; their lookups carry
+    on in the background and land in the cache for the next call. With
+    `cached_only` nothing is fetched: one cache round trip returns whatever
+    is already cached (a missing part is None). ``"not_found"`` is set for
+    releases Discogs answered 404 for (see NEGATIVE_TTL).
+    """
+    global _enrich_executor, _enrich_pid
+    ids = []
+    for rid in release_ids:
         try:
-            data = resp.json() or {}
-        except Exception:
-            data = {}
+            rid = int(rid)
+        except (TypeError, ValueError):
+            continue
+        if rid > 0 and rid not in ids:
+            ids.append(rid)
+    if cached_only or not ids:
+        return _cached_enrichment(ids)
+
+    with _enrich_lock:
+        if _enrich_executor is None or _enrich_pid != os.getpid():
+            _enrich_executor = ThreadPoolExecutor(max_workers=ENRICH_WORKERS, thread_name_prefix="discogs-enrich")
+            _enrich_pid = os.getpid()
+    futures = {_enrich_executor.submit(_enrich_one, rid): rid for rid in ids}
+    done, _ = wait(futures, timeout=budget)
+    out = {}
+    for future in done:
         try:
-            cache.set(key, data, ttl)
+            out[futures[future]] = future.result()
         except Exception:
-            pass
-        return data
-
-    return cached or {}
+            continue
+    return out
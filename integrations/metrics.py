@@ -0,0 +1,171 @@
+"""Lightweight metrics aggregated across workers through the Django cache.
+
+Counters and latency histograms are tallied in process and pushed to the
+cache in batches with ``cache.incr``: after FLUSH_EVERY events, or by a
+timer FLUSH_INTERVAL seconds after the first unflushed event, so an idle
+worker doesn't sit on its tallies. Recording a metric costs no cache round
+trip on the hot path. Gauges hold the most recent value reported by any
+worker.
+
+Histogram buckets (``<name>.bucket_<ms>``) count the observations that fell
+between the previous bound and `ms`; they are not cumulative.
+
+The cache can't enumerate keys, so readers pass the metric names they want
+(see integrations.discogs.metrics_snapshot).
+"""
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from django.core.cache import cache
+from django.db import connection
+
+COUNTER_KEY = "metrics:counter:{}"
+GAUGE_KEY = "metrics:gauge:{}"
+
+# Histogram bucket upper bounds in milliseconds; the last bucket is open-ended
+BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+FLUSH_EVERY = 50
+FLUSH_INTERVAL = 30.0
+
+_lock = threading.Lock()
+_pending: Dict[str, int] = {}
+_events = 0
+_timer: Optional[threading.Timer] = None
+_timer_pid: Optional[int] = None
+
+
+def _bucket_names(name: str) -> List[str]:
+    return [f"{name}.bucket_{b}" for b in BUCKETS_MS] + [f"{name}.bucket_inf"]
+
+
+def _record(updates: Dict[str, int]) -> None:
+    global _events, _timer, _timer_pid
+    with _lock:
+        for key, n in updates.items():
+            _pending[key] = _pending.get(key, 0) + n
+        _events += 1
+        if _events < FLUSH_EVERY:
+            # A timer inherited through fork never fires in the child
+            if _timer is None or _timer_pid != os.getpid():
+                _timer = threading.Timer(FLUSH_INTERVAL, _flush_on_timer)
+                _timer.daemon = True
+                _timer.start()
+                _timer_pid = os.getpid()
+            return
+    flush()
+
+
+def _flush_on_timer() -> None:
+    try:
+        flush()
+    finally:
+        # The cache may be database backed
+        connection.close()
+
+
+def flush() -> None:
+    """Push this process's pending tallies to the cache now."""
+    global _events, _timer
+    with _lock:
+        batch = dict(_pending)
+        _pending.clear()
+        _events = 0
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+    for name, count in batch.items():
+        if not count:
+            continue
+        key = COUNTER_KEY.format(name)
+        try:
+            if not cache.add(key, count, None):
+                cache.incr(key, count)
+        except Exception:
+            pass
+
+
+def incr(name: str, n: int = 1) -> None:
+    """Add `n` to counter `name`."""
+    _record({name: n})
+
+
+def observe(name: str, seconds: float) -> None:
+    """Record one duration in histogram `name`."""
+    ms = seconds * 1000
+    bucket = next((b for b in BUCKETS_MS if ms <= b), None)
+    _record({
+        f"{name}.bucket_{bucket if bucket is not None else 'inf'}": 1,
+        f"{name}.count": 1,
+        f"{name}.sum_ms": int(ms),
+    })
+
+
+def set_gauge(name: str, value) -> None:
+    try:
+        cache.set(GAUGE_KEY.format(name), (value, time.time()), None)
+    except Exception:
+        pass
+
+
+def counters(names: Iterable[str]) -> Dict[str, int]:
+    """Return current counter values, including this process's unflushed tallies."""
+    names = list(names)
+    try:
+        found = cache.get_many([COUNTER_KEY.format(n) for n in names])
+    except Exception:
+        found = {}
+    with _lock:
+        pending = dict(_pending)
+    return {n: int(found.get(COUNTER_KEY.format(n)) or 0) + pending.get(n, 0) for n in names}
+
+
+def histogram(name: str) -> Dict[str, object]:
+    """Return ``{'count', 'avg_ms', 'p50_ms', 'p95_ms', 'buckets'}`` for `name`.
+
+    Percentiles are the upper bound of the bucket they fall in (None when it
+    is the open-ended one).
+    """
+    bucket_names = _bucket_names(name)
+    values = counters(bucket_names + [f"{name}.count", f"{name}.sum_ms"])
+    count = values[f"{name}.count"]
+    buckets = [(bound, values[bn]) for bound, bn in zip(list(BUCKETS_MS) + [None], bucket_names)]
+
+    def percentile(p: float) -> Optional[int]:
+        if not count:
+            return None
+        target, seen = count * p, 0
+        for bound, n in buckets:
+            seen += n
+            if seen >= target:
+                return bound
+        return None
+
+    return {
+        "count": count,
+        "avg_ms": (values[f"{name}.sum_ms"] / count) if count else None,
+        "p50_ms": percentile(0.5),
+        "p95_ms": percentile(0.95),
+        "buckets": buckets,
+    }
+
+
+def gauge(name: str):
+    """Return ``(value, set_at)`` for gauge `name`, or ``(None, None)``."""
+    try:
+        found = cache.get(GAUGE_KEY.format(name))
+    except Exception:
+        found = None
+    return found or (None, None)
+
+
+def reset(counter_names: Iterable[str], histogram_names: Iterable[str] = (), gauge_names: Iterable[str] = ()) -> None:
+    names = list(counter_names)
+    for h in histogram_names:
+        names += _bucket_names(h) + [f"{h}.count", f"{h}.sum_ms"]
+    with _lock:
+        for n in names:
+            _pending.pop(n, None)
+    cache.delete_many([COUNTER_KEY.format(n) for n in names] + [GAUGE_KEY.format(g) for g in gauge_names])
@@ -0,0 +1,103 @@
+"""Cache-backed rate limiting shared by every worker and dyno.
+
+Each limiter is a sliding-window counter: calls are counted per fixed
+window with ``cache.incr``, and a call is allowed while the current count
+plus the previous window's count, weighted by how much of the previous
+window still overlaps the last `period` seconds, stays within the limit.
+That approximates a moving window like the one Discogs enforces, so a
+full quota spent at the end of one window can't be spent again right at
+the start of the next. Because the counters live in the Django cache, all
+gunicorn workers draw from the same quota, as long as the cache is shared
+between them (LocMemCache only limits each process on its own).
+
+A limiter can also be blocked outright for a while, e.g. when the upstream
+API answers 429 with a Retry-After header.
+"""
+import time
+from typing import Optional, Tuple
+
+from django.core.cache import cache
+
+
+class RateLimited(Exception):
+    """Raised when no token could be taken within the caller's wait budget."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"rate limited, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    def __init__(self, name: str, limit: int, period: float = 60.0):
+        self.name = name
+        self.limit = limit
+        self.period = period
+
+    def _window_key(self, window: int) -> str:
+        return f"ratelimit:{self.name}:{window}"
+
+    def _blocked_key(self) -> str:
+        return f"ratelimit:{self.name}:blocked"
+
+    def keys(self, now: float) -> Tuple[str, str, str]:
+        """The blocked, previous-window and current-window keys at `now`."""
+        window = int(now // self.period)
+        return self._blocked_key(), self._window_key(window - 1), self._window_key(window)
+
+    def used(self, previous: int, current: int, now: float) -> float:
+        """Calls counted against the sliding window ending at `now`."""
+        overlap = 1.0 - (now % self.period) / self.period
+        return previous * overlap + current
+
+    def _retry_after(self, previous: int, current: int, now: float) -> float:
+        """Seconds until the sliding window has room for one more call."""
+        to_next_window = self.period - now % self.period
+        excess = self.used(previous, current, now) + 1 - self.limit
+        if previous and excess <= previous:
+            # The previous window's weight decays by previous/period per second
+            return min(excess * self.period / previous, to_next_window)
+        return to_next_window
+
+    def try_acquire(self) -> float:
+        """Take a call. Returns 0 on success, else seconds until one may be free."""
+        now = time.time()
+        blocked_key, previous_key, current_key = self.keys(now)
+        try:
+            found = cache.get_many([blocked_key, previous_key])
+            blocked_until = found.get(blocked_key)
+            if blocked_until and blocked_until > now:
+                return blocked_until - now
+            previous = int(found.get(previous_key) or 0)
+            # Expire the counter once the following window is over too
+            cache.add(current_key, 0, int(self.period * 2) + 1)
+            current = cache.incr(current_key)
+            if self.used(previous, current, now) <= self.limit:
+                return 0.0
+            # Over the limit: give the call back so refusals don't use quota
+            cache.decr(current_key)
+        except Exception:
+            # A cache outage shouldn't stop all API traffic
+            return 0.0
+        return max(self._retry_after(previous, current - 1, now), 0.01)
+
+    def acquire(self, wait: float = 0.0) -> None:
+        """Take a token, waiting up to `wait` seconds; raise RateLimited otherwise."""
+        deadline = time.monotonic() + wait
+        while True:
+            retry_after = self.try_acquire()
+            if not retry_after:
+                return
+            remaining = deadline - time.monotonic()
+            if retry_after > remaining:
+                raise RateLimited(retry_after)
+            time.sleep(retry_after)
+
+    def block(self, seconds: Optional[float] = None) -> None:
+        """Refuse every token for `seconds` (default: the rest of the window)."""
+        now = time.time()
+        if seconds is None:
+            seconds = (int(now // self.period) + 1) * self.period - now
+        try:
+            cache.set(self._blocked_key(), now + seconds, max(1, int(seconds) + 1))
+        except Exception:
+            pass
@@ -0,0 +1,162 @@
+"""A pool of Discogs personal access tokens sharing the API load.
+
+Discogs rate limits each token separately, so every token in the pool gets
+its own RateLimiter quota (see integrations.ratelimit). Each call goes to
+the token with the most headroom: the lower of what is left of its quota
+and the last ``X-Discogs-Ratelimit-Remaining`` Discogs reported for it.
+Ties and near-ties are broken at random in proportion to headroom, so
+workers picking at the same moment spread over the pool instead of all
+landing on one token.
+
+A token answering 429 is ejected until its Retry-After has passed, and one
+answering 401 (revoked or mistyped) for EJECT_SECONDS, as long as another
+token in the pool is still usable: a lone token is never ejected for a
+401, so one stray answer can't stop all traffic. Ejection is a block on
+the token's limiter, so it holds for every worker sharing the cache.
+
+Tokens are never written to the cache; keys use a short fingerprint.
+"""
+import hashlib
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from django.core.cache import cache
+
+from integrations.ratelimit import RateLimited, RateLimiter
+
+REMAINING_KEY = "tokenpool:{}:remaining"
+
+# How long reported quota is trusted; Discogs uses a moving 60 s window
+REMAINING_MAX_AGE = 60.0
+
+
+def fingerprint(token: Optional[str]) -> str:
+    """Return a short, non-reversible name for `token` (``anon`` for None)."""
+    if not token:
+        return "anon"
+    return hashlib.sha1(token.encode("utf-8")).hexdigest()[:8]
+
+
+class TokenPool:
+    def __init__(self, tokens: List[str], limit: int, period: float = 60.0, eject_seconds: float = 600.0):
+        # Keep the configured order but drop blanks and duplicates
+        self.tokens = list(dict.fromkeys(t.strip() for t in tokens if t and t.strip()))
+        self.limit = limit
+        self.period = period
+        self.eject_seconds = eject_seconds
+        self._limiters: Dict[str, RateLimiter] = {}
+
+    def limiter(self, token: Optional[str]) -> RateLimiter:
+        name = fingerprint(token)
+        if name not in self._limiters:
+            # Unauthenticated calls keep the bucket name used before the pool
+            self._limiters[name] = RateLimiter("discogs" if not token else f"discogs:{name}", self.limit, self.period)
+        return self._limiters[name]
+
+    def headroom(self) -> Dict[Optional[str], int]:
+        """Return the calls each token may still make, read in one cache round trip."""
+        return {token: room for token, (_, room) in self._read().items()}
+
+    def has_spare(self, share: float) -> bool:
+        """Whether no token is blocked and more than `share` of the pool's quota is left."""
+        found = self._read()
+        if any(blocked for blocked, _ in found.values()):
+            return False
+        return sum(room for _, room in found.values()) > share * self.limit * len(found)
+
+    def _read(self) -> Dict[Optional[str], Tuple[bool, int]]:
+        """Return ``(blocked, headroom)`` per token from one cache round trip."""
+        tokens = self.tokens or [None]
+        now = time.time()
+        keys = {}
+        for token in tokens:
+            keys[token] = self.limiter(token).keys(now) + (REMAINING_KEY.format(fingerprint(token)),)
+        try:
+            found = cache.get_many([k for ks in keys.values() for k in ks])
+        except Exception:
+            found = {}
+        out = {}
+        for token, (blocked_key, previous_key, current_key, remaining_key) in keys.items():
+            blocked_until = found.get(blocked_key)
+            if blocked_until and blocked_until > now:
+                out[token] = (True, 0)
+                continue
+            used = self.limiter(token).used(int(found.get(previous_key) or 0), int(found.get(current_key) or 0), now)
+            room = int(self.limit - used)
+            reported = found.get(remaining_key)
+            if reported and now - reported[1] < REMAINING_MAX_AGE:
+                room = min(room, reported[0])
+            out[token] = (False, max(room, 0))
+        return out
+
+    def _pick(self, exclude: set) -> Optional[str]:
+        rooms = [(t, r) for t, r in self.headroom().items() if r > 0 and t not in exclude]
+        if not rooms:
+            return None
+        best = max(r for _, r in rooms)
+        # Only tokens close to the best compete, weighted by their headroom
+        candidates = [(t, r) for t, r in rooms if r * 2 >= best]
+        return random.choices([t for t, _ in candidates], weights=[r for _, r in candidates])[0]
+
+    def acquire(self, token: Optional[str] = None, wait: float = 0.0) -> Optional[str]:
+        """Take a call from `token`'s bucket, or from the pool's best token.
+
+        Returns the token to authenticate with (None when no token is
+        configured). Waits up to `wait` seconds and raises RateLimited when
+        no token has a call free in time.
+        """
+        if token or len(self.tokens) <= 1:
+            token = token or (self.tokens[0] if self.tokens else None)
+            self.limiter(token).acquire(wait)
+            return token
+        deadline = time.monotonic() + wait
+        while True:
+            tried = set()
+            retry_after = None
+            while True:
+                candidate = self._pick(tried)
+                if candidate is None:
+                    break
+                delay = self.limiter(candidate).try_acquire()
+                if not delay:
+                    return candidate
+                tried.add(candidate)
+                retry_after = delay if retry_after is None else min(retry_after, delay)
+            if retry_after is None:
+                # Every token is ejected or used up: wait for the next window
+                retry_after = self.period - time.time() % self.period
+            if retry_after > deadline - time.monotonic():
+                raise RateLimited(retry_after)
+            time.sleep(retry_after)
+
+    def report(self, token: Optional[str], status_code: int, remaining: Optional[str], retry_after: Optional[str]) -> None:
+        """Record a response made with `token`, ejecting the token if it failed."""
+        limiter = self.limiter(token)
+        if status_code == 429:
+            limiter.block(float(retry_after) if retry_after and retry_after.isdigit() else None)
+        elif status_code == 401 and token and self._others_usable(token):
+            limiter.block(self.eject_seconds)
+        elif remaining == "0":
+            limiter.block()
+        if remaining is not None and remaining.isdigit():
+            try:
+                cache.set(REMAINING_KEY.format(fingerprint(token)), (int(remaining), time.time()), int(REMAINING_MAX_AGE))
+            except Exception:
+                pass
+
+    def _others_usable(self, token: str) -> bool:
+        """Whether a token other than `token` isn't ejected (it may be out of quota for now)."""
+        others = [self.limiter(t)._blocked_key() for t in self.tokens if t != token]
+        if not others:
+            return False
+        try:
+            found = cache.get_many(others)
+        except Exception:
+            return False
+        now = time.time()
+        return any(not (found.get(key) and found[key] > now) for key in others)
+
+    def status(self) -> List[Tuple[str, int]]:
+        """Return ``(fingerprint, headroom)`` per token, for the metrics page."""
+        return [(fingerprint(t), room) for t, room in self.headroom().items()]
@@ -0,0 +1,87 @@
+"""Compare bare requests.get with the pooled Discogs session.
+
+Usage:
+  Activate your venv, then:
+    python scripts/bench_discogs_session.py [--requests 200] [--handshake-ms 0]
+
+Starts a local keep-alive HTTP stub that answers like /releases/<id> and
+times the same number of GETs made with a new connection each time
+(``requests.get``, the old behaviour) and through
+``integrations.discogs.get_session()``. ``--handshake-ms`` adds a delay to
+every new connection to approximate the TCP+TLS setup cost of reaching
+api.discogs.com from the dyno.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BODY = json.dumps({"id": 1, "title": "Stub", "artists": [{"name": "Stub"}]}).encode()
+
+
+def make_handler(handshake_delay):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in separate writes; without TCP_NODELAY a
+        # kept-alive connection stalls on delayed ACKs and skews the timings.
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            if handshake_delay:
+                time.sleep(handshake_delay)
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY)
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+
+def timed(label, get, url, count):
+    start = time.perf_counter()
+    for i in range(count):
+        resp = get(f"{url}/releases/{i}")
+        resp.raise_for_status()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<16} {count} requests in {elapsed:.3f}s ({elapsed / count * 1000:.2f} ms/request)")
+    return elapsed
+
+
+if __name__ == "__main__":
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, root)
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--handshake-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.handshake_ms / 1000.0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    # The stub isn't Discogs; don't let the shared rate limiter throttle it
+    os.environ["DISCOGS_RATE_LIMIT"] = str(args.requests * 10)
+
+    import django
+    django.setup()
+    import requests
+    from integrations import discogs
+
+    try:
+        bare = timed("requests.get", lambda u: requests.get(u, timeout=10), url, args.requests)
+        pooled = timed("pooled session", discogs._get, url, args.requests)
+        print(f"speed-up: {bare / pooled:.1f}x")
+    finally:
+        server.shutdown()
@@ -780,49 +780,106 @@ document.addEventListener('DOMContentLoaded', function(){
     });
   }
   initAddToBasketForms();
-  // Eagerly fetch formats_lines for all visible cards on the current page (concurrency-limited)
+  window.initAddToBasketForms = initAddToBasketForms;
+  // Store "load more": fetch the next keyset page of cards and append them
+  function initStoreLoadMore(){
+    const link = document.querySelector('.store-load-more');
+    const grid = document.querySelector('[data-section="all"]');
+    if(!link || !grid) return;
+    link.addEventListener('click', async function(ev){
+      ev.preventDefault();
+      if(link._loading) return;
+      link._loading = true;
+      const base = link.dataset.baseQuery || '';
+      const cursor = link.dataset.nextCursor || '';
+      const url = `${location.pathname}?${base ? base + '&' : ''}cursor=${encodeURIComponent(cursor)}`;
+      try{
+        const resp = await fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' }, credentials: 'same-origin' });
+        if(!resp.ok){ window.location = link.href; return; }
+        const data = await resp.json();
+        grid.insertAdjacentHTML('beforeend', data.html || '');
+        // wire up handlers on the newly inserted cards
+        try{ initNotesOverlays(); }catch(e){}
+        try{ if(window.initImageViewerButtons) window.initImageViewerButtons(); }catch(e){}
+        try{ initAddToBasketForms(); }catch(e){}
+        if(data.next_cursor){
+          link.dataset.nextCursor = data.next_cursor;
+          link.href = `?${base ? base + '&' : ''}cursor=${encodeURIComponent(data.next_cursor)}`;
+        } else {
+          link.remove();
+        }
+      }catch(err){
+        console.error('load more error', err);
+        showToast('Unable to load more listings.', 'error');
+      }finally{
+        link._loading = false;
+      }
+    });
+  }
+  initStoreLoadMore();
+  // Enrich the Discogs search cards (artist, formats, notes, suggested price)
+  // with one batch request; cards already filled from the cache are skipped
   (function(){
-    const cards = Array.from(document.querySelectorAll('.card[data-release-id]'));
-    if(!cards.length) return;
-    const concurrency = 4;
-    let idx = 0;
-    async function worker(){
-      while(true){
-        const i = idx++;
-        if(i >= cards.length) return;
-        const card = cards[i];
-        const releaseId = card.getAttribute('data-release-id');
-        if(!releaseId) continue;
-        const idMatch = String(releaseId).match(/(\d+)/);
-        if(!idMatch) continue;
-        const id = idMatch[1];
-        try{
-          const resp = await fetch(`/manage/discogs/release_details/${id}/`);
-          if(!resp.ok) continue;
-          const data = await resp.json();
-          if(data.formats_lines && data.formats_lines.length){
-            const formatsArea = card.querySelector('.formats-area');
-            if(formatsArea){
-              let html = '<ul class="list-unstyled small mb-1">';
-              for(const line of data.formats_lines){
-                html += `<li>${line}</li>`;
-              }
-              html += '</ul>';
-              formatsArea.innerHTML = html;
-            }
-          }
-          // Populate all overlay instances associated with this release id
-          if(data.notes){
-            const overlays = Array.from(document.querySelectorAll(`.notes-overlay[data-release-pk="${id}"]`));
-            overlays.forEach(function(o){
-              const body = o.querySelector('.card-body');
-              if(body) body.innerHTML = notesToHtml(data.notes || '');
-              o.dataset.loaded = '1';
-            });
+    const container = document.querySelector('.discogs-results[data-enrich-url]');
+    if(!container) return;
+    const enrichUrl = container.getAttribute('data-enrich-url');
+    // Server-rendered notes are plain text; apply the same markup as fetched ones
+    container.querySelectorAll('.notes-overlay[data-loaded="1"] .card-body').forEach(function(body){
+      body.innerHTML = notesToHtml(body.textContent);
+    });
+    function applyDetails(id, data){
+      const card = container.querySelector(`.card[data-release-id="${id}"]`);
+      if(!card) return;
+      if(data.artist){
+        const artist = card.querySelector('.result-artist');
+        if(artist) artist.textContent = data.artist;
+      }
+      if(data.formats_lines && data.formats_lines.length){
+        const formatsArea = card.querySelector('.formats-area');
+        if(formatsArea){
+          let html = '<ul class="list-unstyled small mb-1">';
+          for(const line of data.formats_lines){
+            html += `<li>${escapeHtml(line)}</li>`;
           }
-        }catch(err){ /* ignore */ }
+          html += '</ul>';
+          formatsArea.innerHTML = html;
+        }
+      }
+      if(data.suggested_price){
+        const price = card.querySelector('.suggested-price');
+        if(price){
+          price.querySelector('.suggested-price-value').textContent = data.suggested_price;
+          price.classList.remove('d-none');
+        }
       }
+      // Populate all overlay instances associated with this release id
+      if(data.notes){
+        const overlays = Array.from(document.querySelectorAll(`.notes-overlay[data-release-pk="${id}"]`));
+        overlays.forEach(function(o){
+          const body = o.querySelector('.card-body');
+          if(body) body.innerHTML = notesToHtml(data.notes || '');
+          o.dataset.loaded = '1';
+        });
+      }
+      if(data.complete) card.dataset.enriched = '1';
+    }
+    async function enrich(ids, retries){
+      if(!ids.length) return;
+      try{
+        const resp = await fetch(`${enrichUrl}?ids=${ids.join(',')}`);
+        if(!resp.ok) return;
+        const data = await resp.json();
+        Object.keys(data.releases || {}).forEach(function(id){ applyDetails(id, data.releases[id]); });
+        // Lookups still running server-side land in the cache; ask once more
+        if(retries > 0 && data.pending && data.pending.length){
+          setTimeout(function(){ enrich(data.pending, retries - 1); }, 3000);
+        }
+      }catch(err){ /* ignore */ }
     }
-    for(let i=0;i<concurrency;i++) worker();
+    const ids = Array.from(container.querySelectorAll('.card[data-release-id]'))
+      .filter(function(card){ return card.dataset.enriched !== '1'; })
+      .map(function(card){ return card.getAttribute('data-release-id'); })
+      .filter(function(id){ return /^\d+$/.test(id); });
+    enrich(ids, 1);
   })();
 });